@@ -0,0 +1,380 @@
+"""
+Benchmarks for the scrape and download paths against a local fixture site.
+
+Starts an HTTP fixture server that serves synthetic paginated sites and binary media,
+drives /scrape, /scrape-metadata, /start-download-media and /download-zip in-process,
+and prints one JSON report (pages/sec, MB/sec, p50/p99 latency, peak RSS). Each scenario
+runs in its own process, so its peak RSS is its own:
+
+    python bench.py --pages 50 --latency-ms 20 --output bench_output.txt
+
+Every scrape and download uses its own fixture site, so the document and media caches
+start cold each time.
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Keep the app's job store, scrape state and media cache away from a real installation
+BENCH_DIR = tempfile.mkdtemp(prefix="audiobreak-bench-")
+os.environ.setdefault("JOB_STORE_URL", "sqlite:///" + os.path.join(BENCH_DIR, "jobs.sqlite3"))
+os.environ.setdefault("SCRAPE_STATE_PATH", os.path.join(BENCH_DIR, "scrape-state.sqlite3"))
+os.environ.setdefault("MEDIA_CACHE_DIR", os.path.join(BENCH_DIR, "media-cache"))
+
+import httpx
+
+import main
+
+SCENARIOS = ("scrape", "scrape_metadata", "download")
+
+class FixtureSite:
+    """
+    Synthetic site: /s/<site>/page/<n> are paginated listing pages of about page_size
+    bytes with media_per_page items each, and /m/<site>/<i>.mp3 are media_size byte files.
+    """
+    def __init__(self, pages, page_size, media_per_page, media_size, latency):
+        self.pages = pages
+        self.page_size = page_size
+        self.media_per_page = media_per_page
+        self.latency = latency
+        self.media = random.Random(0).randbytes(media_size)
+
+    def page(self, site, n):
+        items = []
+        for i in range(self.media_per_page):
+            index = (n - 1) * self.media_per_page + i
+            items.append(
+                f'<div class="item"><h2>Item {index}</h2>'
+                f'<img src="/m/{site}/{index}.jpg"><audio src="/m/{site}/{index}.mp3"></audio>'
+                f'<a href="/m/{site}/{index}.pdf">Notes</a></div>'
+            )
+        if n < self.pages:
+            items.append(f'<a class="next" href="/s/{site}/page/{n + 1}">Next</a>')
+        body = "".join(items)
+        filler = max(0, self.page_size - len(body) - 200)
+        text = ("lorem ipsum dolor sit amet " * (filler // 27 + 1))[:filler]
+        return (
+            f"<html><head><title>Fixture {site} page {n}</title></head>"
+            f"<body><main>{body}<p>{text}</p></main></body></html>"
+        ).encode()
+
+    def handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                self.respond(send_body=True)
+
+            def do_HEAD(self):
+                self.respond(send_body=False)
+
+            def respond(self, send_body):
+                if site.latency:
+                    time.sleep(site.latency)
+                parts = self.path.split("?")[0].strip("/").split("/")
+                if len(parts) == 4 and parts[0] == "s" and parts[2] == "page" and parts[3].isdigit():
+                    self.reply(site.page(parts[1], int(parts[3])), "text/html; charset=utf-8", send_body=send_body)
+                elif len(parts) == 3 and parts[0] == "m":
+                    self.reply(site.media, "application/octet-stream", send_body=send_body, ranged=True)
+                else:
+                    self.reply(b"not found", "text/plain", status=404, send_body=send_body)
+
+            def reply(self, body, content_type, status=200, send_body=True, ranged=False):
+                headers = {}
+                if ranged:
+                    headers["Accept-Ranges"] = "bytes"
+                    size = len(body)
+                    span = byte_range(self.headers.get("Range"), size)
+                    if span == "unsatisfiable":
+                        status, body = 416, b""
+                        headers["Content-Range"] = f"bytes */{size}"
+                    elif span:
+                        start, end = span
+                        status, body = 206, body[start:end + 1]
+                        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if send_body:
+                    self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+def byte_range(header, size):
+    """
+    (start, end) of a single "bytes=a-b", "bytes=a-" or "bytes=-n" range, None when
+    there is no usable Range header, or "unsatisfiable" when it starts past the end.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if not first:
+            start, end = max(0, size - int(last)), size - 1
+        else:
+            start, end = int(first), min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    if start > end and start < size:
+        return None
+    if start >= size:
+        return "unsatisfiable"
+    return start, end
+
+@contextlib.contextmanager
+def fixture_server(site):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), site.handler())
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+def peak_rss_mb():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def summarize(latencies, seconds, **totals):
+    """
+    Common report fields; `totals` are added as-is plus a per-second rate for each.
+    """
+    report = {"requests": len(latencies), "seconds": round(seconds, 3)}
+    for name, value in totals.items():
+        report[name] = value
+        report[f"{name}_per_sec"] = round(value / seconds, 2) if seconds else None
+    report["latency_ms"] = {
+        "p50": round(percentile(latencies, 50) * 1000, 1),
+        "p99": round(percentile(latencies, 99) * 1000, 1),
+    }
+    report["peak_rss_mb"] = peak_rss_mb()
+    return report
+
+async def run_concurrently(count, concurrency, func):
+    """
+    Runs func(i) for i in range(count), `concurrency` at a time. Returns (latencies, results, seconds).
+    """
+    slots = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def timed(i):
+        async with slots:
+            started = time.perf_counter()
+            result = await func(i)
+            latencies.append(time.perf_counter() - started)
+            return result
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(timed(i) for i in range(count)))
+    return latencies, results, time.perf_counter() - started
+
+async def bench_scrape(client, base, args, run):
+    async def scrape(i):
+        response = await client.post("/scrape", json={
+            "url": f"{base}/s/{run}-scrape-{i}/page/1",
+            "selector": "div.item",
+            "media_types": ["img", "audio", "pdf"],
+            "follow_pagination": True,
+            "pagination_selector": "a.next",
+            "pagination_type": "next",
+        })
+        response.raise_for_status()
+        data = response.json()
+        if data.get("errors"):
+            raise RuntimeError(f"scrape errors: {data['errors'][:3]}")
+        return len(data["scraped_pages"])
+
+    latencies, pages, seconds = await run_concurrently(args.iterations, args.concurrency, scrape)
+    return summarize(latencies, seconds, pages=sum(pages))
+
+async def bench_scrape_metadata(client, base, args, run):
+    async def metadata(i):
+        response = await client.post("/scrape-metadata", json={"url": f"{base}/s/{run}-meta-{i}/page/1"})
+        response.raise_for_status()
+        return 1
+
+    count = args.iterations * args.pages
+    latencies, pages, seconds = await run_concurrently(count, args.concurrency, metadata)
+    return summarize(latencies, seconds, pages=sum(pages))
+
+async def download_size(path):
+    """
+    GETs `path` from the app and returns the body's size. The body is counted as it is
+    sent and dropped: httpx's ASGITransport would hold all of it in this process and add
+    it to the reported peak RSS.
+    """
+    requested = False
+    done = asyncio.Event()
+    status = None
+    size = 0
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Starlette listens for a disconnect while streaming; only send one at the end
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status, size
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+            if not message.get("more_body", False):
+                done.set()
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 0), "server": ("bench", 80),
+    }
+    await main.app(scope, receive, send)
+    if status != 200:
+        raise RuntimeError(f"GET {path} returned {status}")
+    return size
+
+async def bench_download(client, base, args, run):
+    async def download(i):
+        site = f"{run}-download-{i}"
+        urls = [f"{base}/m/{site}/{n}.mp3" for n in range(args.download_files)]
+        response = await client.post("/start-download-media", json={"urls": urls, "zip_name": f"{site}.zip"})
+        response.raise_for_status()
+        job_id = response.json()["job_id"]
+        deadline = time.monotonic() + args.timeout
+        while not (await client.get(f"/download-ready/{job_id}")).json()["ready"]:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"download job {job_id} not ready after {args.timeout}s")
+            await asyncio.sleep(0.05)
+        zip_size = await download_size(f"/download-zip/{job_id}")
+        await client.delete(f"/download-zip/{job_id}")
+        return len(urls) * args.media_size, zip_size
+
+    latencies, sizes, seconds = await run_concurrently(args.iterations, args.concurrency, download)
+    media_mb = sum(size for size, _ in sizes) / (1024 * 1024)
+    report = summarize(latencies, seconds, mb=round(media_mb, 2))
+    report["zip_mb"] = round(sum(zip_size for _, zip_size in sizes) / (1024 * 1024), 2)
+    return report
+
+BENCHMARKS = {
+    "scrape": bench_scrape,
+    "scrape_metadata": bench_scrape_metadata,
+    "download": bench_download,
+}
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+async def run_benchmarks(args):
+    site = FixtureSite(args.pages, args.page_size, args.media_per_page, args.media_size, args.latency_ms / 1000)
+    run = datetime.datetime.utcnow().strftime("%Y%m%d%H%M%S")
+    report = {
+        "timestamp": datetime.datetime.utcnow().isoformat() + "Z",
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "results": {},
+    }
+    transport = httpx.ASGITransport(app=main.app)
+    with fixture_server(site) as base:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=args.timeout) as client:
+            for name in args.scenarios:
+                report["results"][name] = await BENCHMARKS[name](client, base, args, run)
+    return report
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark scrape and download throughput against a local fixture site.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument("--pages", type=int, default=20, help="pages per fixture site")
+    parser.add_argument("--page-size", type=int, default=50_000, help="approximate bytes per page")
+    parser.add_argument("--media-per-page", type=int, default=20, help="media items listed per page")
+    parser.add_argument("--media-size", type=int, default=1024 * 1024, help="bytes per media file")
+    parser.add_argument("--download-files", type=int, default=20, help="files per download job")
+    parser.add_argument("--latency-ms", type=float, default=0, help="delay added to every fixture response")
+    parser.add_argument("--iterations", type=int, default=5, help="scrapes / download jobs per scenario")
+    parser.add_argument("--concurrency", type=int, default=1, help="requests in flight at once")
+    parser.add_argument("--timeout", type=float, default=300, help="seconds before a request or job is abandoned")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    return args
+
+def run_isolated(args):
+    """
+    Runs each scenario in a fresh process and merges their reports, so that peak RSS
+    (a high-water mark for the whole process), caches and allocator state do not carry
+    over from one scenario to the next.
+    """
+    options = [f"--{key.replace('_', '-')}={value}" for key, value in vars(args).items() if key not in ("scenarios", "output")]
+    report = None
+    for name in args.scenarios:
+        child = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), *options, f"--scenarios={name}"],
+            stdout=subprocess.PIPE, text=True, check=True,
+        )
+        result = json.loads(child.stdout)
+        if report is None:
+            report = result
+            report["config"]["scenarios"] = args.scenarios
+        else:
+            report["results"].update(result["results"])
+    return report
+
+def main_cli(argv=None):
+    args = parse_args(argv)
+    if len(args.scenarios) > 1:
+        report = run_isolated(args)
+    else:
+        # The app logs to stdout; keep it clear for the report
+        with contextlib.redirect_stdout(sys.stderr):
+            report = asyncio.run(run_benchmarks(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main_cli()
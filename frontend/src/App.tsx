@@ -108,7 +108,8 @@ function App() {
     // Clear previous pagination links selection as well
     setSelectedPaginationLinks(new Set());
     try {
-      const response = await fetch('/scrape', {
+      // Stream one NDJSON record per page so results show up while the crawl runs
+      const response = await fetch('/scrape/stream', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({
@@ -119,10 +120,25 @@ function App() {
           pagination_links: selectedPaginationLinks.size > 0 ? Array.from(selectedPaginationLinks) : undefined,
         }),
       });
-      if (!response.ok) throw new Error(await response.text());
-      const data = await response.json();
-      setResults(data.results || []);
-      setMediaAssets(data.media_assets || []);
+      if (!response.ok || !response.body) throw new Error(await response.text());
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffered = '';
+      for (;;) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffered += decoder.decode(value, { stream: true });
+        const lines = buffered.split('\n');
+        buffered = lines.pop() || '';
+        for (const line of lines) {
+          if (!line.trim()) continue;
+          const record = JSON.parse(line);
+          if (record.type === 'page') {
+            setResults(prev => [...prev, ...(record.results || [])]);
+            setMediaAssets(prev => [...prev, ...(record.media_assets || [])]);
+          }
+        }
+      }
     } catch (err: any) {
       setError(err.message || 'Error occurred');
     } finally {
@@ -501,6 +517,13 @@ function App() {
                 {downloadProgress.current !== undefined && downloadProgress.total !== undefined && downloadProgress.status !== 'Preparing ZIP...'
                   ? <span> ({downloadProgress.current} of {downloadProgress.total} files)</span>
                   : null}
+                {downloadProgress.bytes_downloaded > 0 && downloadProgress.status !== 'ready' && (
+                  <span>
+                    {' '}| {(downloadProgress.bytes_downloaded / 1024 / 1024).toFixed(2)}
+                    {downloadProgress.bytes_total > 0 ? ` of ${(downloadProgress.bytes_total / 1024 / 1024).toFixed(2)}` : ''} MB
+                    {downloadProgress.throughput > 0 ? ` at ${(downloadProgress.throughput / 1024 / 1024).toFixed(2)} MB/s` : ''}
+                  </span>
+                )}
                 {downloadProgress.zip_size > 0 && (
                   <span> | ZIP size: {(downloadProgress.zip_size / 1024 / 1024).toFixed(2)} MB</span>
                 )}
@@ -527,8 +550,8 @@ function App() {
           <Button
             variant="outline-danger"
             onClick={async () => {
-              // If a download job exists and is not ready, or is ready but not downloaded, delete it on the backend
-              if (downloadJobId && downloadProgress && !downloadReady) {
+              // If a download job exists, cancel it or release its ZIP on the backend
+              if (downloadJobId) {
                 try {
                   await fetch(`/download-zip/${downloadJobId}`, { method: 'DELETE' });
                 } catch {}
@@ -1,21 +1,51 @@
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
-from fastapi.responses import StreamingResponse, Response
+from fastapi.responses import StreamingResponse, Response, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional
 import requests
+import httpx
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from http.cookiejar import DefaultCookiePolicy
 from bs4 import BeautifulSoup
+from bs4.builder import builder_registry
+from prometheus_client import CONTENT_TYPE_LATEST, Gauge, Histogram, generate_latest
+import abc
 import io
 import zipfile
 import os
 import tempfile
 import threading
+import queue
+import asyncio
+import anyio.to_thread
+import contextlib
+import contextvars
+import weakref
+import email.utils
+import sqlite3
 import time
 import uuid
+import hashlib
 import json
 import datetime
+import re
+import soupsieve
+from collections import OrderedDict, deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse, urlunparse, urljoin, urldefrag, unquote
+from urllib.robotparser import RobotFileParser
 
-app = FastAPI()
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # The event loop's default executor runs asyncio.to_thread calls and DNS lookups;
+    # swap it for an instrumented one of the same size (see InstrumentedExecutor)
+    asyncio.get_running_loop().set_default_executor(InstrumentedExecutor("default", min(32, (os.cpu_count() or 1) + 4)))
+    yield
+
+app = FastAPI(lifespan=lifespan)
 
 # Allow CORS for frontend on localhost:5173
 app.add_middleware(
@@ -35,6 +65,12 @@ class ScrapeRequest(BaseModel):
     pagination_selector: Optional[str] = None
     pagination_type: Optional[str] = "next"  # "next" or "list"
     pagination_links: Optional[list[str]] = None  # NEW: explicit pagination links
+    parser: Optional[str] = None  # HTML parser backend, defaults to HTML_PARSER
+    incremental: Optional[bool] = False  # only return pages that are new or changed since the last run
+    max_pages: Optional[int] = None  # crawl budget, defaults to CRAWL_MAX_PAGES
+    max_depth: Optional[int] = None  # link hops from the start page(s); unlimited by default
+    same_host: Optional[bool] = True  # only follow links to the host(s) of the start page(s)
+    debug: Optional[bool] = False  # add a per-stage timing breakdown to the response
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
@@ -45,144 +81,779 @@ HEADERS = {
     "Referer": "https://www.google.com/"
 }
 
-@app.post("/scrape")
-def scrape_site(request: ScrapeRequest):
-    def scrape_single(url):
+# Prometheus metrics, served at /metrics. Stage timings are also collected per request
+# for /scrape's optional debug block while a stage_timings dict is set in the context.
+BYTE_BUCKETS = tuple(2 ** n for n in range(10, 36, 2))  # 1 KB .. 16 GB
+FETCH_SECONDS = Histogram("audiobreak_fetch_seconds", "HTTP fetch latency including retries, until the body (or, when streamed, the headers) arrives", ["host"])
+SCRAPE_STAGE_SECONDS = Histogram("audiobreak_scrape_stage_seconds", "Time spent per page in each scrape stage", ["stage"])
+ZIP_BUILD_SECONDS = Histogram("audiobreak_zip_build_seconds", "Time to download and zip a set of media files", ["mode"],
+                              buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600))
+BYTES_STREAMED = Histogram("audiobreak_bytes_streamed", "Bytes sent per download response", ["endpoint"], buckets=BYTE_BUCKETS)
+ACTIVE_JOBS = Gauge("audiobreak_active_jobs", "Download jobs currently running")
+JOB_STORE_JOBS = Gauge("audiobreak_job_store_jobs", "Jobs in the job store, including finished ones awaiting cleanup")
+JOB_QUEUE_DEPTH = Gauge("audiobreak_job_queue_depth", "Download jobs waiting for a worker")
+POOL_WORKERS = Gauge("audiobreak_pool_workers", "Threads in a worker pool", ["pool"])
+POOL_TASKS = Gauge("audiobreak_pool_tasks", "Tasks running or waiting on a worker pool; above pool_workers means saturated", ["pool"])
+
+stage_timings = contextvars.ContextVar("stage_timings", default=None)
+
+@contextlib.contextmanager
+def timed(stage, histogram):
+    """
+    Observes the block's duration in `histogram` and adds it to the request's stage timings, if collected.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        histogram.observe(seconds)
+        timings = stage_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0) + seconds
+
+def url_host(url):
+    try:
+        return urlparse(url).hostname or "unknown"
+    except ValueError:
+        return "unknown"
+
+# Outbound HTTP: one pooled session shared by every endpoint and worker
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "30"))
+HTTP_RETRIES = int(os.environ.get("HTTP_RETRIES", "3"))
+HTTP_BACKOFF_FACTOR = float(os.environ.get("HTTP_BACKOFF_FACTOR", "0.5"))
+HTTP_MAX_RETRY_AFTER = float(os.environ.get("HTTP_MAX_RETRY_AFTER", "60"))
+HTTP_POOL_HOSTS = int(os.environ.get("HTTP_POOL_HOSTS", "32"))
+HTTP_POOL_PER_HOST = int(os.environ.get("HTTP_POOL_PER_HOST", "10"))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+class CappedRetry(Retry):
+    """
+    Retry policy that honors Retry-After but never sleeps longer than HTTP_MAX_RETRY_AFTER.
+    """
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, HTTP_MAX_RETRY_AFTER)
+
+def make_http_session():
+    retry = CappedRetry(
+        total=HTTP_RETRIES,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=HTTP_POOL_PER_HOST, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    # The session is shared between unrelated users and sites, so never keep cookies
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return session
+
+http_session = make_http_session()
+
+def http_get(url, headers=None, timeout=None, **kwargs):
+    """
+    GET through the shared session with the default (connect, read) timeouts.
+    """
+    if timeout is None:
+        timeout = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+    with timed("fetch", FETCH_SECONDS.labels(url_host(url))):
+        return http_session.get(url, headers=headers, timeout=timeout, **kwargs)
+
+def http_head(url, headers=None, timeout=None):
+    """
+    HEAD through the shared session, following redirects as GET does.
+    """
+    if timeout is None:
+        timeout = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+    with timed("fetch", FETCH_SECONDS.labels(url_host(url))):
+        return http_session.head(url, headers=headers, timeout=timeout, allow_redirects=True)
+
+class LoopLocal:
+    """
+    Lazily creates one instance of an asyncio-bound object (HTTP client, semaphores)
+    per running event loop, since such objects cannot be shared between loops.
+    """
+    def __init__(self, factory):
+        self.factory = factory
+        self.values = weakref.WeakKeyDictionary()
+        self.lock = threading.Lock()
+
+    def get(self):
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            value = self.values.get(loop)
+            if value is None:
+                value = self.values[loop] = self.factory()
+        return value
+
+def make_async_http_client():
+    connections = HTTP_POOL_HOSTS * HTTP_POOL_PER_HOST
+    client = httpx.AsyncClient(
+        timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections),
+        follow_redirects=True,
+    )
+    client.cookies.jar.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return client
+
+async_http_client = LoopLocal(make_async_http_client)
+
+def retry_delay(attempt, response=None):
+    """
+    Seconds to wait before retry number `attempt` (from 0), mirroring CappedRetry:
+    a Retry-After header wins, capped at HTTP_MAX_RETRY_AFTER, else exponential backoff.
+    """
+    retry_after = response.headers.get('Retry-After') if response is not None else None
+    if retry_after:
+        if retry_after.strip().isdigit():
+            return min(float(retry_after), HTTP_MAX_RETRY_AFTER)
+        try:
+            when = email.utils.parsedate_to_datetime(retry_after)
+            wait = (when - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+            return min(max(wait, 0), HTTP_MAX_RETRY_AFTER)
+        except (TypeError, ValueError):
+            pass
+    return min(HTTP_BACKOFF_FACTOR * (2 ** attempt), Retry.DEFAULT_BACKOFF_MAX)
+
+async def http_get_async(url, headers=None, stream=False):
+    """
+    Async counterpart of http_get on the event loop's shared httpx client, with the
+    same timeouts and retry policy. With stream=True the body is left unread and the
+    caller must aclose() the response.
+    """
+    client = async_http_client.get()
+    with timed("fetch", FETCH_SECONDS.labels(url_host(url))):
+        attempt = 0
+        while True:
+            try:
+                response = await client.send(client.build_request("GET", url, headers=headers), stream=stream)
+            except httpx.TransportError:
+                if attempt >= HTTP_RETRIES:
+                    raise
+                await asyncio.sleep(retry_delay(attempt))
+                attempt += 1
+                continue
+            if response.status_code not in RETRY_STATUSES or attempt >= HTTP_RETRIES:
+                return response
+            delay = retry_delay(attempt, response)
+            await response.aclose()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+# HTML parser backends. Each one builds a BeautifulSoup tree, so CSS selection
+# (soupsieve) and tree navigation behave the same on the tree either backend builds.
+HTML_PARSERS = {
+    "lxml": "lxml",            # libxml2, C, much faster than the pure-Python parser
+    "html.parser": "html.parser",
+}
+
+def available_html_parsers():
+    return [name for name, features in HTML_PARSERS.items() if builder_registry.lookup(features)]
+
+# html.parser stays the default: lxml repairs malformed markup differently and does not
+# know HTML5-only void elements, so some pages give different results (see README.md)
+HTML_PARSER = os.environ.get("HTML_PARSER") or "html.parser"
+
+def resolve_html_parser(parser=None):
+    """
+    Returns the backend to use for a request, raising 400 if it is unknown or not installed.
+    """
+    parser = parser or HTML_PARSER
+    if parser not in available_html_parsers():
+        raise HTTPException(status_code=400, detail=f"Unsupported parser: {parser}. Available: {', '.join(available_html_parsers())}")
+    return parser
+
+def parse_html(markup, parser=None):
+    """
+    Parses `markup` with the given backend (or the server default).
+    """
+    return BeautifulSoup(markup, HTML_PARSERS[parser or HTML_PARSER])
+
+# Crawl concurrency: page fetches run on the event loop, bounded globally and per host.
+# Parsing and extraction are CPU-bound and run on a small thread pool instead.
+SCRAPE_MAX_WORKERS = int(os.environ.get("SCRAPE_MAX_WORKERS", "16"))
+SCRAPE_MAX_PER_HOST = int(os.environ.get("SCRAPE_MAX_PER_HOST", "4"))
+PARSE_MAX_WORKERS = int(os.environ.get("PARSE_MAX_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+class InstrumentedExecutor(ThreadPoolExecutor):
+    """
+    Thread pool that reports its size and the tasks running or waiting on it.
+    """
+    def __init__(self, name, max_workers):
+        super().__init__(max_workers=max_workers, thread_name_prefix=name)
+        POOL_WORKERS.labels(name).set(max_workers)
+        self.tasks = POOL_TASKS.labels(name)
+
+    def submit(self, fn, *args, **kwargs):
+        self.tasks.inc()
+        future = super().submit(fn, *args, **kwargs)
+        future.add_done_callback(lambda _: self.tasks.dec())
+        return future
+
+parse_executor = InstrumentedExecutor("parse", PARSE_MAX_WORKERS)
+
+async def run_blocking(func, *args):
+    """
+    Runs CPU-bound or blocking `func(*args)` on the parse pool, off the event loop.
+    The caller's context (stage timings) carries over to the worker thread.
+    """
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(parse_executor, context.run, func, *args)
+
+class HostSlots:
+    """
+    Per-host semaphores bounding how many requests run against a single host at once.
+    """
+    def __init__(self, limit):
+        self.limit = limit
+        self.slots = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, url):
+        host = urlparse(url).netloc.lower()
+        with self.lock:
+            slot = self.slots.get(host)
+            if slot is None:
+                slot = self.slots[host] = threading.BoundedSemaphore(self.limit)
+        return slot
+
+class AsyncHostSlots:
+    """
+    HostSlots for coroutines: per-host asyncio semaphores on the running event loop.
+    """
+    def __init__(self, limit):
+        self.limit = limit
+        self.slots = LoopLocal(dict)
+
+    def __call__(self, url):
+        slots = self.slots.get()
+        host = urlparse(url).netloc.lower()
+        slot = slots.get(host)
+        if slot is None:
+            slot = slots[host] = asyncio.Semaphore(self.limit)
+        return slot
+
+scrape_slots = LoopLocal(lambda: asyncio.Semaphore(SCRAPE_MAX_WORKERS))
+scrape_host_slot = AsyncHostSlots(SCRAPE_MAX_PER_HOST)
+
+# robots.txt Crawl-delay is honored for page fetches (not media downloads)
+CRAWL_RESPECT_ROBOTS = os.environ.get("CRAWL_RESPECT_ROBOTS", "1") not in ("0", "false", "no")
+CRAWL_MAX_DELAY_SECONDS = float(os.environ.get("CRAWL_MAX_DELAY_SECONDS", "30"))
+ROBOTS_TTL_SECONDS = 3600
+
+class CrawlDelays:
+    """
+    Spaces page fetches to a host by the Crawl-delay in its robots.txt (capped at
+    CRAWL_MAX_DELAY_SECONDS). robots.txt is fetched once per host per ROBOTS_TTL_SECONDS.
+    """
+    def __init__(self):
+        self.delays = {}     # host -> (expires, delay or None)
+        self.next_slot = {}  # host -> monotonic time the next fetch may start
+        self.locks = LoopLocal(dict)
+
+    async def wait(self, url):
+        if not CRAWL_RESPECT_ROBOTS:
+            return
+        host = urlparse(url).netloc.lower()
+        delay = await self.delay_for(url, host)
+        if not delay:
+            return
+        # Reserve the next free slot before sleeping, so concurrent fetches queue up behind each other
+        now = time.monotonic()
+        start = max(now, self.next_slot.get(host, 0))
+        self.next_slot[host] = start + delay
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def delay_for(self, url, host):
+        cached = self.delays.get(host)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        lock = self.locks.get().setdefault(host, asyncio.Lock())
+        async with lock:
+            cached = self.delays.get(host)
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
+            delay = await self.fetch_delay(url)
+            self.delays[host] = (time.monotonic() + ROBOTS_TTL_SECONDS, delay)
+            return delay
+
+    async def fetch_delay(self, url):
+        parsed = urlparse(url)
+        try:
+            response = await http_get_async(f"{parsed.scheme}://{parsed.netloc}/robots.txt", headers=HEADERS)
+        except httpx.HTTPError:
+            return None
+        if response.status_code != 200:
+            return None
+        robots = RobotFileParser()
+        robots.modified()  # crawl_delay() reports nothing for a parser that was never marked as read
+        robots.parse(response.text.splitlines())
+        delay = robots.crawl_delay(HEADERS["User-Agent"])
+        return min(float(delay), CRAWL_MAX_DELAY_SECONDS) if delay else None
+
+crawl_delays = CrawlDelays()
+
+# Fetched and parsed pages, shared by /scrape-metadata and /scrape
+DOC_CACHE_TTL_SECONDS = float(os.environ.get("DOC_CACHE_TTL_SECONDS", "300"))
+DOC_CACHE_MAX_ENTRIES = int(os.environ.get("DOC_CACHE_MAX_ENTRIES", "256"))
+DOC_CACHE_MAX_BYTES = int(os.environ.get("DOC_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))  # estimated, see document_size
+# Memory of one node (tag or string) of a parsed tree, measured with tracemalloc on
+# html.parser and lxml trees: 600-1100 bytes, more for tag-dense pages.
+TREE_NODE_BYTES = 800
+
+def document_size(content, soup):
+    """
+    Estimated memory of a cached page: its source, plus a parsed tree of about the
+    same text and TREE_NODE_BYTES per node. Tag-dense pages take 40x their source.
+    """
+    return 2 * len(content) + TREE_NODE_BYTES * sum(1 for _ in soup.descendants)
+
+class DocumentCache:
+    """
+    Bounded LRU cache of fetched and parsed pages.
+
+    Entries are keyed by (url, parser, validator), where the validator is the page's
+    ETag or Last-Modified, so a changed page never shares an entry with its previous
+    version. Entries younger than `ttl` are served as is; older ones are revalidated
+    with a conditional GET and reused on 304. `max_bytes` bounds the estimated memory
+    of the entries, parsed trees included (see document_size).
+    """
+    def __init__(self, ttl, max_entries, max_bytes):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.latest = {}  # (url, parser) -> key of the newest entry for that page
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'revalidations': 0, 'evictions': 0}
+
+    async def get(self, url, parser):
+        """
+        Returns the cached document for `url`, fetching or revalidating it as needed.
+        Raises on network errors and non-2xx responses.
+        """
+        key, entry, fresh = self._lookup(url, parser)
+        if fresh:
+            return entry
+        response = await self._request(url, entry and entry['etag'], entry and entry['last_modified'])
+        if entry and response.status_code == 304:
+            self._revalidated(key, entry)
+            return entry
+        return await run_blocking(self._load, url, parser, response)
+
+    async def get_if_changed(self, url, parser, etag, last_modified):
+        """
+        Like get(), but conditional on validators the caller saw earlier: returns None,
+        without downloading or parsing, if the page has not changed since then.
+        """
+        key, entry, fresh = self._lookup(url, parser, count_hit=False)
+        same_version = entry and (etag or last_modified) and (entry['etag'], entry['last_modified']) == (etag, last_modified)
+        if fresh and same_version:
+            with self.lock:
+                self.counters['hits'] += 1
+            return None
+        response = await self._request(url, etag, last_modified)
+        if (etag or last_modified) and response.status_code == 304:
+            if same_version:
+                self._revalidated(key, entry)
+            return None
+        return await run_blocking(self._load, url, parser, response)
+
+    def _lookup(self, url, parser, count_hit=True):
+        with self.lock:
+            key = self.latest.get((url, parser))
+            entry = self.entries.get(key) if key else None
+            fresh = bool(entry) and time.time() - entry['fetched'] < self.ttl
+            if fresh:
+                self.entries.move_to_end(key)
+                if count_hit:
+                    self.counters['hits'] += 1
+            return key, entry, fresh
+
+    async def _request(self, url, etag=None, last_modified=None):
+        headers = dict(HEADERS)
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        await crawl_delays.wait(url)
+        async with scrape_slots.get(), scrape_host_slot(url):
+            return await http_get_async(url, headers=headers)
+
+    def _revalidated(self, key, entry):
+        with self.lock:
+            entry['fetched'] = time.time()
+            if key in self.entries:
+                self.entries.move_to_end(key)
+            self.counters['revalidations'] += 1
+
+    def _load(self, url, parser, response):
+        response.raise_for_status()
+        content = response.content
+        soup = self._parse(content, parser)
+        entry = {
+            'url': url,
+            'content': content,
+            'soup': soup,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'fetched': time.time(),
+            'size': document_size(content, soup),
+        }
+        with self.lock:
+            self.counters['misses'] += 1
+            self._store(entry, parser)
+        return entry
+
+    def _parse(self, content, parser):
+        with timed("parse", SCRAPE_STAGE_SECONDS.labels("parse")):
+            return parse_html(content, parser)
+
+    def _store(self, entry, parser):
+        url = entry['url']
+        previous = self.latest.get((url, parser))
+        if previous in self.entries:
+            self._remove(previous)
+        if entry['size'] > self.max_bytes:
+            return
+        key = (url, parser, entry['etag'] or entry['last_modified'])
+        self.entries[key] = entry
+        self.latest[(url, parser)] = key
+        self.bytes += entry['size']
+        while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+            self.counters['evictions'] += 1
+
+    def _remove(self, key):
+        entry = self.entries.pop(key)
+        self.bytes -= entry['size']
+        if self.latest.get(key[:2]) == key:
+            del self.latest[key[:2]]
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, entries=len(self.entries), bytes=self.bytes,
+                        max_entries=self.max_entries, max_bytes=self.max_bytes)
+
+document_cache = DocumentCache(DOC_CACHE_TTL_SECONDS, DOC_CACHE_MAX_ENTRIES, DOC_CACHE_MAX_BYTES)
+
+# Incremental scrapes remember, per page and extraction settings, the validators
+# and a hash of what was extracted on the previous run
+SCRAPE_STATE_PATH = os.environ.get("SCRAPE_STATE_PATH") or os.path.join(tempfile.gettempdir(), "audiobreak-scrape-state.sqlite3")
+
+class ScrapeState:
+    """
+    Durable per-page state for incremental scrapes, stored in a WAL-mode SQLite database.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS pages (url TEXT NOT NULL, settings TEXT NOT NULL, etag TEXT, last_modified TEXT, "
+            "content_hash TEXT NOT NULL, next_links TEXT NOT NULL, list_links TEXT NOT NULL, updated REAL NOT NULL, "
+            "PRIMARY KEY (url, settings))"
+        )
+
+    def _conn(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self.local.conn = conn
+        return conn
+
+    def get(self, url, settings):
+        row = self._conn().execute(
+            "SELECT etag, last_modified, content_hash, next_links, list_links FROM pages WHERE url = ? AND settings = ?",
+            (url, settings),
+        ).fetchone()
+        if row is None:
+            return None
+        return {'etag': row[0], 'last_modified': row[1], 'content_hash': row[2],
+                'next_links': json.loads(row[3]), 'list_links': json.loads(row[4])}
+
+    def put(self, url, settings, etag, last_modified, content_hash, next_links, list_links):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO pages (url, settings, etag, last_modified, content_hash, next_links, list_links, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (url, settings, etag, last_modified, content_hash, json.dumps(next_links), json.dumps(list_links), time.time()),
+        )
+
+scrape_state = ScrapeState(SCRAPE_STATE_PATH)
+
+def scrape_settings_key(request: ScrapeRequest, parser):
+    """
+    Fingerprint of the settings that shape what is extracted from a page.
+    """
+    settings = [request.selector, request.keyword, request.media_types, request.follow_pagination,
+                request.pagination_selector, request.pagination_type, parser]
+    return hashlib.sha256(json.dumps(settings).encode()).hexdigest()
+
+MEDIA_TYPES = ('img', 'audio', 'video', 'pdf', 'svg')
+MEDIA_TAGS = ['img', 'audio', 'video', 'source', 'a', 'object']
+
+def source_parent(tag):
+    """
+    Name of the element a <source> tag belongs to. lxml does not know <source> is a void
+    element and nests each one in the previous, so those are looked through.
+    """
+    parent = tag.parent
+    while parent is not None and parent.name == 'source':
+        parent = parent.parent
+    return parent.name if parent is not None else None
+
+def clean_media_url(base_url, src):
+    """
+    Makes a media URL absolute and strips its query string.
+    """
+    src = urljoin(base_url, src)
+    return urlunparse(urlparse(src)._replace(query=''))
+
+def extract_media(soup, base_url, media_types):
+    """
+    Collects media assets of every requested type in a single walk of the tree.
+    Each URL is normalized once and reported once per type. Assets are ordered by
+    type as requested, with element sources before nested <source> tags.
+    """
+    wanted = [mtype for mtype in dict.fromkeys(media_types) if mtype in MEDIA_TYPES]
+    if not wanted:
+        return []
+    # Two buckets per type: the element itself, then <source> children / <object> data
+    buckets = {mtype: ([], []) for mtype in wanted}
+    cleaned = {}
+    def add(mtype, part, src):
+        if mtype in buckets:
+            if src not in cleaned:
+                cleaned[src] = clean_media_url(base_url, src)
+            buckets[mtype][part].append(cleaned[src])
+    for tag in soup.find_all(MEDIA_TAGS):
+        name = tag.name
+        if name == 'img':
+            src = tag.get('src')
+            if src:
+                add('img', 0, src)
+                if src.lower().endswith('.svg'):
+                    add('svg', 0, src)
+        elif name == 'audio' or name == 'video':
+            src = tag.get('src')
+            if src:
+                add(name, 0, src)
+        elif name == 'source':
+            parent = source_parent(tag)
+            if parent == 'audio' or parent == 'video':
+                src = tag.get('src')
+                if src:
+                    add(parent, 1, src)
+        elif name == 'a':
+            href = tag.get('href')
+            if href and href.lower().endswith('.pdf'):
+                add('pdf', 0, href)
+        elif name == 'object':
+            data = tag.get('data')
+            if data and data.lower().endswith('.svg'):
+                add('svg', 1, data)
+    media_assets = []
+    seen = set()
+    for mtype in wanted:
+        for part in buckets[mtype]:
+            for media_url in part:
+                if (media_url, mtype) in seen:
+                    continue
+                seen.add((media_url, mtype))
+                media_assets.append({'url': media_url, 'type': mtype})
+    return media_assets
+
+CRAWL_MAX_PAGES = int(os.environ.get("CRAWL_MAX_PAGES", "1000"))
+
+def canonical_url(url):
+    """
+    Form of `url` used to tell whether two links point at the same page: no fragment,
+    lower-case scheme and host, no default port, no trailing slash and no empty query.
+    """
+    parsed = urlparse(urldefrag(url)[0])
+    scheme = parsed.scheme.lower()
+    netloc = parsed.netloc.lower()
+    if (scheme, parsed.port) in (("http", 80), ("https", 443)):
+        netloc = netloc.rsplit(":", 1)[0]
+    path = parsed.path.rstrip("/") or "/"
+    return urlunparse((scheme, netloc, path, parsed.params, parsed.query, ""))
+
+def crawl_host(url):
+    """
+    Host of `url` as compared by a same-host crawl: "www.example.com" and
+    "example.com" count as one site.
+    """
+    host = urlparse(canonical_url(url)).netloc
+    return host[4:] if host.startswith("www.") else host
+
+class CrawlFrontier:
+    """
+    FIFO of pages to crawl. Each page is queued at most once, whatever spelling its links
+    use (see canonical_url), with O(1) membership checks. Links beyond the page or depth
+    budget, to other hosts when scoped, or that cannot be parsed as URLs (such as a port
+    out of range) are collected in `skipped` instead of queued.
+    """
+    def __init__(self, max_pages, max_depth=None, hosts=None):
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.hosts = hosts
+        self.queue = deque()
+        self.seen = set()
+        self.skipped = {"max_pages": set(), "max_depth": set(), "other_host": set(), "invalid": set()}
+
+    def __bool__(self):
+        return bool(self.queue)
+
+    def add(self, url, depth):
+        """
+        Queues `url` (without its fragment) and returns it, or returns None if it is
+        already known, invalid, or out of budget or scope.
+        """
         try:
-            response = requests.get(url, headers=HEADERS)
-            response.raise_for_status()
+            key = canonical_url(url)
+        except ValueError:
+            self.skipped["invalid"].add(url)
+            return None
+        if key in self.seen:
+            return None
+        if self.hosts is not None and crawl_host(key) not in self.hosts:
+            self.skipped["other_host"].add(key)
+            return None
+        if self.max_depth is not None and depth > self.max_depth:
+            self.skipped["max_depth"].add(key)
+            return None
+        if len(self.seen) >= self.max_pages:
+            self.skipped["max_pages"].add(key)
+            return None
+        self.seen.add(key)
+        url = urldefrag(url)[0]
+        self.queue.append((url, depth))
+        return url
+
+    def pop(self):
+        return self.queue.popleft()
+
+async def crawl(request: ScrapeRequest, parser):
+    """
+    Crawls the pages described by `request`. Yields one "page" record per scraped page,
+    in crawl order and as soon as it is parsed, followed by a final "summary" record.
+    """
+    settings = scrape_settings_key(request, parser) if request.incremental else None
+    async def scrape_single(url):
+        # Returns (results, media_assets, error, next_links, list_links, page_status);
+        # page_status is "new", "changed" or "unchanged" for incremental scrapes.
+        state = await run_blocking(scrape_state.get, url, settings) if request.incremental else None
+        try:
+            if state:
+                doc = await document_cache.get_if_changed(url, parser, state['etag'], state['last_modified'])
+                if doc is None:
+                    # 304: nothing to parse, follow the links seen last time
+                    return [], [], None, state['next_links'], state['list_links'], "unchanged"
+            else:
+                doc = await document_cache.get(url, parser)
         except Exception as e:
-            return None, None, str(e), []
-        soup = BeautifulSoup(response.text, "html.parser")
-        # Use selector if provided, else default to paragraphs
-        if request.selector:
-            elements = soup.select(request.selector)
-        else:
-            elements = soup.find_all('p')
-        # Filter by keyword if provided
-        if request.keyword:
-            results = [el.text for el in elements if request.keyword.lower() in el.text.lower()]
-        else:
-            results = [el.text for el in elements]
+            return None, None, str(e), [], [], None
+        return await run_blocking(extract_page, url, doc, state)
+
+    def extract_page(url, doc, state):
+        soup = doc['soup']
+        with timed("select", SCRAPE_STAGE_SECONDS.labels("select")):
+            # Use selector if provided, else default to paragraphs
+            if request.selector:
+                elements = soup.select(request.selector)
+            else:
+                elements = soup.find_all('p')
+            # Filter by keyword if provided
+            if request.keyword:
+                results = [el.text for el in elements if request.keyword.lower() in el.text.lower()]
+            else:
+                results = [el.text for el in elements]
         # Scrape media assets if requested
-        media_assets = []
-        from urllib.parse import urlparse, urlunparse, urljoin
-        if request.media_types:
-            for mtype in request.media_types:
-                if mtype == 'img':
-                    for tag in soup.find_all('img'):
-                        src = tag.get('src')
-                        if src:
-                            # Make absolute URL
-                            src = urljoin(url, src)
-                            parsed = urlparse(src)
-                            clean_src = urlunparse(parsed._replace(query=''))
-                            media_assets.append({'url': clean_src, 'type': 'img'})
-                if mtype == 'audio':
-                    for tag in soup.find_all('audio'):
-                        src = tag.get('src')
-                        if src:
-                            src = urljoin(url, src)
-                            parsed = urlparse(src)
-                            clean_src = urlunparse(parsed._replace(query=''))
-                            media_assets.append({'url': clean_src, 'type': 'audio'})
-                    for tag in soup.find_all('source'):
-                        if tag.parent and tag.parent.name == 'audio':
-                            src = tag.get('src')
-                            if src:
-                                src = urljoin(url, src)
-                                parsed = urlparse(src)
-                                clean_src = urlunparse(parsed._replace(query=''))
-                                media_assets.append({'url': clean_src, 'type': 'audio'})
-                if mtype == 'video':
-                    for tag in soup.find_all('video'):
-                        src = tag.get('src')
-                        if src:
-                            src = urljoin(url, src)
-                            parsed = urlparse(src)
-                            clean_src = urlunparse(parsed._replace(query=''))
-                            media_assets.append({'url': clean_src, 'type': 'video'})
-                    for tag in soup.find_all('source'):
-                        if tag.parent and tag.parent.name == 'video':
-                            src = tag.get('src')
-                            if src:
-                                src = urljoin(url, src)
-                                parsed = urlparse(src)
-                                clean_src = urlunparse(parsed._replace(query=''))
-                                media_assets.append({'url': clean_src, 'type': 'video'})
-                if mtype == 'pdf':
-                    for tag in soup.find_all('a', href=True):
-                        href = tag['href']
-                        if href.lower().endswith('.pdf'):
-                            href = urljoin(url, href)
-                            parsed = urlparse(href)
-                            clean_href = urlunparse(parsed._replace(query=''))
-                            media_assets.append({'url': clean_href, 'type': 'pdf'})
-                if mtype == 'svg':
-                    for tag in soup.find_all('img'):
-                        src = tag.get('src')
-                        if src and src.lower().endswith('.svg'):
-                            src = urljoin(url, src)
-                            parsed = urlparse(src)
-                            clean_src = urlunparse(parsed._replace(query=''))
-                            media_assets.append({'url': clean_src, 'type': 'svg'})
-                    for tag in soup.find_all('object'):
-                        data = tag.get('data')
-                        if data and data.lower().endswith('.svg'):
-                            data = urljoin(url, data)
-                            parsed = urlparse(data)
-                            clean_data = urlunparse(parsed._replace(query=''))
-                            media_assets.append({'url': clean_data, 'type': 'svg'})
-        # Find pagination links if enabled
-        next_links = []
-        list_links = []
-        if request.follow_pagination and request.pagination_selector:
-            if request.pagination_type == "next":
-                # Type A: single next link
-                a = soup.select_one(request.pagination_selector)
-                if a:
-                    href = a.get('href')
-                    if href:
-                        if not href.startswith('http'):
-                            from urllib.parse import urljoin
-                            href = urljoin(url, href)
-                        next_links.append(href)
-            elif request.pagination_type == "list":
-                # Type B: list of all page links
-                for a in soup.select(request.pagination_selector):
-                    href = a.get('href')
-                    if href:
-                        if not href.startswith('http'):
-                            from urllib.parse import urljoin
-                            href = urljoin(url, href)
-                        list_links.append(href)
-                        next_links.append(href)
-        return results, media_assets, None, next_links, list_links
+        with timed("media", SCRAPE_STAGE_SECONDS.labels("media")):
+            media_assets = extract_media(soup, url, request.media_types) if request.media_types else []
+        with timed("pagination", SCRAPE_STAGE_SECONDS.labels("pagination")):
+            # Find pagination links if enabled
+            next_links = []
+            list_links = []
+            if request.follow_pagination and request.pagination_selector:
+                if request.pagination_type == "next":
+                    # Type A: single next link
+                    a = soup.select_one(request.pagination_selector)
+                    if a:
+                        href = a.get('href')
+                        if href:
+                            if not href.startswith('http'):
+                                from urllib.parse import urljoin
+                                href = urljoin(url, href)
+                            next_links.append(href)
+                elif request.pagination_type == "list":
+                    # Type B: list of all page links
+                    for a in soup.select(request.pagination_selector):
+                        href = a.get('href')
+                        if href:
+                            if not href.startswith('http'):
+                                from urllib.parse import urljoin
+                                href = urljoin(url, href)
+                            list_links.append(href)
+                            next_links.append(href)
+        page_status = None
+        if request.incremental:
+            content_hash = hashlib.sha256(json.dumps([results, media_assets, next_links, list_links]).encode()).hexdigest()
+            scrape_state.put(url, settings, doc['etag'], doc['last_modified'], content_hash, next_links, list_links)
+            if not state:
+                page_status = "new"
+            elif state['content_hash'] != content_hash:
+                page_status = "changed"
+            else:
+                return [], [], None, next_links, list_links, "unchanged"
+        return results, media_assets, None, next_links, list_links, page_status
 
-    all_results = []
-    all_media = []
+    seen_media = set()
     errors = []
-    visited = set()
-    # If explicit pagination_links are provided and not empty, use them as the to_visit list (and only those)
+    # If explicit pagination_links are provided and not empty, use them as the start pages (and only those)
     if request.pagination_links and len(request.pagination_links) > 0:
         # Only use the provided pagination links for scraping (do not add the main url again)
-        to_visit = list(dict.fromkeys(request.pagination_links))
+        start_urls = request.pagination_links
     else:
         # Always use the main url if no pagination links are provided
-        to_visit = [request.url]
+        start_urls = [request.url]
+    hosts = None
+    if request.same_host:
+        hosts = set()
+        for url in start_urls:
+            try:
+                hosts.add(crawl_host(url))
+            except ValueError:
+                pass  # reported as invalid when the frontier refuses it
+    frontier = CrawlFrontier(request.max_pages or CRAWL_MAX_PAGES, request.max_depth, hosts)
     scraped_pages = []
     list_pagination_urls = set()
+    # The next SCRAPE_MAX_WORKERS queued pages are fetched ahead as concurrent tasks
+    # but consumed in queue order, so results and scraped_pages come out exactly as in
+    # a serial crawl, and a slow consumer holds at most that many finished pages.
+    pending = {}
+    def prefetch():
+        for url, _ in islice(frontier.queue, SCRAPE_MAX_WORKERS):
+            if url not in pending:
+                pending[url] = asyncio.ensure_future(scrape_single(url))
 
     print(f"Starting scrape for URL: {request.pagination_selector}")
     # Always populate list_pagination_urls with all hrefs matching the pagination selector, if provided
     if request.pagination_selector:
         print(f"Fetching initial page for pagination selector: {request.pagination_selector}")
         try:
-            response = requests.get(request.url, headers=HEADERS)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, "html.parser")
+            soup = (await document_cache.get(request.url, parser))['soup']
             found_any = False
-            for a in soup.select(request.pagination_selector):
+            for a in await run_blocking(soup.select, request.pagination_selector):
                 href = a.get('href')
                 if href:
                     if not href.startswith('http'):
@@ -197,86 +868,361 @@ def scrape_site(request: ScrapeRequest):
     if request.follow_pagination and request.pagination_type == "list":
         # Always include the initial URL in list_pagination_urls
         list_pagination_urls.add(request.url)
-    while to_visit:
-        current_url = to_visit.pop(0)
-        if current_url in visited:
-            continue
-        visited.add(current_url)
-        scraped_pages.append(current_url)
-        results, media_assets, err, next_links, list_links = scrape_single(current_url)
-        if err:
-            errors.append(f"{current_url}: {err}")
-            continue
-        if results:
-            all_results.extend(results)
-        if media_assets:
-            all_media.extend(media_assets)
-        # For list pagination, accumulate all discovered list links
-        if not request.pagination_links and request.follow_pagination and request.pagination_type == "list":
-            for link in list_links:
-                list_pagination_urls.add(link)
-        if not request.pagination_links:
-            for link in next_links:
-                if link not in visited and link not in to_visit:
-                    to_visit.append(link)
-    response = {"results": all_results, "media_assets": all_media, "scraped_pages": scraped_pages, "errors": errors}
+    for url in start_urls:
+        frontier.add(url, 0)
+    try:
+        while frontier:
+            prefetch()
+            current_url, depth = frontier.pop()
+            scraped_pages.append(current_url)
+            results, media_assets, err, next_links, list_links, page_status = await pending.pop(current_url)
+            page = {"type": "page", "results": [], "media_assets": [], "scraped_pages": [current_url], "errors": [], "list_pagination_urls": []}
+            if request.incremental:
+                page["page_status"] = {current_url: page_status or "error"}
+            if err:
+                page["errors"].append(f"{current_url}: {err}")
+                errors.extend(page["errors"])
+                yield page
+                continue
+            page["results"] = results or []
+            # The same asset (site logo, player skin) usually appears on every page
+            for asset in media_assets or []:
+                key = (asset['url'], asset['type'])
+                if key not in seen_media:
+                    seen_media.add(key)
+                    page["media_assets"].append(asset)
+            # For list pagination, accumulate all discovered list links
+            if not request.pagination_links and request.follow_pagination and request.pagination_type == "list":
+                for link in list_links:
+                    if link not in list_pagination_urls:
+                        list_pagination_urls.add(link)
+                        page["list_pagination_urls"].append(link)
+            if not request.pagination_links:
+                for link in next_links:
+                    frontier.add(link, depth + 1)
+            yield page
+    finally:
+        # Stop prefetching if the consumer went away mid-crawl
+        for task in pending.values():
+            task.cancel()
+    if frontier.skipped["max_pages"]:
+        errors.append(f"Stopped at max_pages={frontier.max_pages}: {len(frontier.skipped['max_pages'])} more linked pages were not scraped")
+    if frontier.skipped["max_depth"]:
+        errors.append(f"Stopped at max_depth={frontier.max_depth}: {len(frontier.skipped['max_depth'])} deeper linked pages were not scraped")
+    if frontier.skipped["other_host"]:
+        errors.append(f"Did not follow {len(frontier.skipped['other_host'])} linked pages on other hosts (set same_host to false to follow them)")
+    if frontier.skipped["invalid"]:
+        invalid = sorted(frontier.skipped["invalid"])
+        errors.append(f"Skipped {len(invalid)} invalid links: {', '.join(invalid[:5])}{', ...' if len(invalid) > 5 else ''}")
+    yield {"type": "summary", "scraped_pages": scraped_pages, "errors": errors, "list_pagination_urls": list(list_pagination_urls)}
+
+@app.post("/scrape")
+async def scrape_site(request: ScrapeRequest):
+    parser = resolve_html_parser(request.parser)
+    return await scrape_result(request, parser)
+
+async def scrape_result(request: ScrapeRequest, parser):
+    """
+    Runs the crawl for `request` and collects its page records into the /scrape response.
+    """
+    if request.debug:
+        stage_timings.set({})
+        started = time.perf_counter()
+    all_results = []
+    all_media = []
+    page_status = {}
+    async for record in crawl(request, parser):
+        if record["type"] == "page":
+            all_results.extend(record["results"])
+            all_media.extend(record["media_assets"])
+            page_status.update(record.get("page_status", {}))
+        else:
+            summary = record
+    response = {"results": all_results, "media_assets": all_media, "scraped_pages": summary["scraped_pages"], "errors": summary["errors"]}
     # Always include pagination URLs in the response
-    response["list_pagination_urls"] = list(list_pagination_urls)
+    response["list_pagination_urls"] = summary["list_pagination_urls"]
+    if request.incremental:
+        response["page_status"] = page_status
+    if request.debug:
+        # Stage times are summed over pages, which are fetched and parsed concurrently,
+        # so together they can exceed total_seconds. Cache hits add no fetch or parse time.
+        response["debug"] = {
+            "total_seconds": round(time.perf_counter() - started, 4),
+            "stage_seconds": {stage: round(seconds, 4) for stage, seconds in stage_timings.get().items()},
+        }
     return response
 
+SCRAPE_STREAM_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream",
+}
+
+@app.post("/scrape/stream")
+async def scrape_stream(request: ScrapeRequest, format: str = "ndjson"):
+    """
+    Streaming variant of /scrape: emits each page's results as soon as it is parsed,
+    as NDJSON lines or SSE events, and ends with a summary record.
+    """
+    if format not in SCRAPE_STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}. Use 'ndjson' or 'sse'.")
+    parser = resolve_html_parser(request.parser)
+    async def record_stream():
+        async for record in crawl(request, parser):
+            yield encode_stream_record(record, format)
+    # X-Accel-Buffering stops nginx from holding records back until the crawl ends
+    return StreamingResponse(record_stream(), media_type=SCRAPE_STREAM_FORMATS[format], headers={"X-Accel-Buffering": "no"})
+
+def encode_stream_record(record, format):
+    if format == "sse":
+        return f"event: {record['type']}\ndata: {json.dumps(record)}\n\n"
+    return json.dumps(record) + "\n"
+
+# Batch scrapes: many sites per call, at most SCRAPE_BATCH_MAX_SITES crawled at once.
+# Page fetches still share the global and per-host limits with every other scrape.
+SCRAPE_BATCH_MAX_SITES = int(os.environ.get("SCRAPE_BATCH_MAX_SITES", "8"))
+SCRAPE_BATCH_MAX_REQUESTS = int(os.environ.get("SCRAPE_BATCH_MAX_REQUESTS", "1000"))
+
+class ScrapeBatchRequest(BaseModel):
+    requests: list[ScrapeRequest]
+    max_concurrency: Optional[int] = None  # sites crawled at once, capped at SCRAPE_BATCH_MAX_SITES
+
+async def scrape_request(request: ScrapeRequest):
+    return await scrape_result(request, resolve_html_parser(request.parser))
+
+async def scrape_batch_tasks(requests, concurrency):
+    """
+    Crawls `requests` with at most `concurrency` running at once and yields
+    (index, finished task) as each one ends. The next crawl started is always from
+    the host with the fewest crawls running (round-robin among ties), so a host with
+    many sites in the batch cannot hold every slot while other hosts wait.
+    """
+    waiting = OrderedDict()  # host -> deque of request indexes
+    for index, request in enumerate(requests):
+        waiting.setdefault(url_host(request.url), deque()).append(index)
+    running = {}   # task -> (index, host)
+    per_host = {}  # host -> crawls running
+    def start_next():
+        host = min(waiting, key=lambda h: per_host.get(h, 0))
+        index = waiting[host].popleft()
+        if waiting[host]:
+            waiting.move_to_end(host)
+        else:
+            del waiting[host]
+        per_host[host] = per_host.get(host, 0) + 1
+        running[asyncio.ensure_future(scrape_request(requests[index]))] = (index, host)
+    try:
+        while waiting or running:
+            while waiting and len(running) < concurrency:
+                start_next()
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index, host = running.pop(task)
+                per_host[host] -= 1
+                yield index, task
+    finally:
+        # Stop the remaining crawls if the consumer went away mid-batch
+        for task in running:
+            task.cancel()
+
+@app.post("/scrape/batch")
+async def scrape_batch(batch: ScrapeBatchRequest, format: str = "ndjson"):
+    """
+    Scrapes several sites in one call. Streams one "site" record per request as it
+    finishes, carrying its index in the batch and either the /scrape response fields
+    or an "error", then a "summary" record. A failing site does not affect the others.
+    """
+    if format not in SCRAPE_STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}. Use 'ndjson' or 'sse'.")
+    if len(batch.requests) > SCRAPE_BATCH_MAX_REQUESTS:
+        raise HTTPException(status_code=400, detail=f"Too many requests in batch: {len(batch.requests)} (max {SCRAPE_BATCH_MAX_REQUESTS}).")
+    concurrency = max(1, min(batch.max_concurrency or SCRAPE_BATCH_MAX_SITES, SCRAPE_BATCH_MAX_SITES))
+    async def record_stream():
+        failed = 0
+        pages = 0
+        async for index, task in scrape_batch_tasks(batch.requests, concurrency):
+            record = {"type": "site", "index": index, "url": batch.requests[index].url}
+            error = task.exception()
+            if error is None:
+                record.update(task.result())
+                pages += len(record["scraped_pages"])
+            else:
+                failed += 1
+                record["error"] = error.detail if isinstance(error, HTTPException) else (str(error) or type(error).__name__)
+            yield encode_stream_record(record, format)
+        yield encode_stream_record({"type": "summary", "sites": len(batch.requests), "failed": failed, "pages": pages}, format)
+    return StreamingResponse(record_stream(), media_type=SCRAPE_STREAM_FORMATS[format], headers={"X-Accel-Buffering": "no"})
+
+# Media that is already compressed gains nothing from deflate, so it is STORED
+STORED_EXTENSIONS = {
+    '.mp3', '.m4a', '.aac', '.ogg', '.oga', '.opus', '.flac', '.wma',
+    '.mp4', '.m4v', '.mov', '.webm', '.mkv', '.avi', '.wmv',
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.avif', '.heic',
+    '.pdf', '.zip', '.gz', '.bz2', '.xz', '.7z', '.rar',
+}
+ZIP_CHUNK_SIZE = 64 * 1024
+ZIP_SPOOL_MAX_MEMORY = 8 * 1024 * 1024  # per file, before /download-media spools it to disk
+
+def media_filename(url):
+    """
+    ZIP entry name for `url`: the decoded last path segment. Separators that only
+    appear once decoded (%2F, %5C) are replaced and leading dots stripped, so the
+    name can never point outside the archive's top level.
+    """
+    name = unquote(urlparse(url).path.rsplit("/", 1)[-1])
+    name = name.replace("/", "_").replace("\\", "_").replace("\x00", "").lstrip(".").strip()
+    return name or "file"
+
+def unique_name(name, taken):
+    """
+    Returns `name`, or name-2, name-3... before the extension if it is already in
+    `taken` (compared case-insensitively, as on most desktop file systems), and adds it.
+    """
+    stem, ext = os.path.splitext(name)
+    candidate = name
+    n = 1
+    while candidate.lower() in taken:
+        n += 1
+        candidate = f"{stem}-{n}{ext}"
+    taken.add(candidate.lower())
+    return candidate
+
+def zip_compress_type(filename):
+    if os.path.splitext(filename)[1].lower() in STORED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+def zip_entry_info(filename):
+    info = zipfile.ZipInfo(filename, date_time=time.localtime()[:6])
+    info.compress_type = zip_compress_type(filename)
+    return info
+
+class ZipStream(io.RawIOBase):
+    """
+    Write-only, unseekable sink for a ZipFile whose output is sent as it is produced.
+    zipfile falls back to data descriptors when it cannot seek back into the stream.
+    """
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.buffer += b
+        return len(b)
+
+    def drain(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+async def spool_media(url, spool):
+    """
+    Downloads `url` into `spool`. Raises if the request fails or the body is cut short.
+    """
+    response = await http_get_async(url, stream=True)
+    try:
+        response.raise_for_status()
+        async for chunk in response.aiter_bytes(ZIP_CHUNK_SIZE):
+            spool.write(chunk)
+    finally:
+        await response.aclose()
+    spool.seek(0)
+
+def copy_to_entry(spool, entry, limit=16 * ZIP_CHUNK_SIZE):
+    """
+    Copies up to `limit` bytes from `spool` into the open ZIP entry; returns how many.
+    """
+    copied = 0
+    while copied < limit:
+        chunk = spool.read(ZIP_CHUNK_SIZE)
+        if not chunk:
+            break
+        entry.write(chunk)
+        copied += len(chunk)
+    return copied
+
+async def iter_media_zip(urls):
+    """
+    Yields a ZIP of `urls` chunk by chunk as the files are downloaded. Each body is
+    spooled (in memory, then on disk past ZIP_SPOOL_MAX_MEMORY) until it has fully
+    arrived, so a failed or truncated download is skipped instead of being stored
+    as a short entry with a valid CRC. Compression runs off the event loop.
+    """
+    started = time.perf_counter()
+    sink = ZipStream()
+    names = set()
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as zf:
+        for url in dict.fromkeys(urls):
+            with tempfile.SpooledTemporaryFile(max_size=ZIP_SPOOL_MAX_MEMORY) as spool:
+                try:
+                    await spool_media(url, spool)
+                except Exception:
+                    continue
+                with zf.open(zip_entry_info(unique_name(media_filename(url), names)), "w", force_zip64=True) as entry:
+                    # Deflate is CPU-bound, so the copy runs on the parse pool a batch at a time
+                    while await run_blocking(copy_to_entry, spool, entry):
+                        data = sink.drain()
+                        if data:
+                            yield data
+    ZIP_BUILD_SECONDS.labels("stream").observe(time.perf_counter() - started)
+    yield sink.drain()
+
+async def count_streamed(chunks, endpoint):
+    sent = 0
+    try:
+        async for chunk in chunks:
+            sent += len(chunk)
+            yield chunk
+    finally:
+        BYTES_STREAMED.labels(endpoint).observe(sent)
+
 @app.post("/download-media")
-def download_media(data: dict):
+async def download_media(data: dict):
     urls = data.get('urls', [])
     zip_name = data.get('zip_name', 'media-assets.zip')
-    temp_dir = tempfile.mkdtemp()
-    file_paths = []
-    # Download each file to temp_dir
-    for url in urls:
-        try:
-            r = requests.get(url, timeout=10)
-            r.raise_for_status()
-            filename = url.split("/")[-1] or "file"
-            file_path = os.path.join(temp_dir, filename)
-            with open(file_path, 'wb') as f:
-                f.write(r.content)
-            file_paths.append(file_path)
-        except Exception:
-            continue
-    # Create zip file in temp_dir
-    zip_path = os.path.join(temp_dir, zip_name)
-    with zipfile.ZipFile(zip_path, "w", allowZip64=True) as zf:
-        for file_path in file_paths:
-            # Write with the original filename, which can contain unicode
-            zf.write(file_path, os.path.basename(file_path))
-    # Stream the zip file as a response
-    def iterfile():
-        with open(zip_path, "rb") as f:
-            while True:
-                chunk = f.read(8192)
-                if not chunk:
-                    break
-                yield chunk
-        import shutil
-        shutil.rmtree(temp_dir, ignore_errors=True)
     from urllib.parse import quote
     quoted_zip_name = quote(zip_name)
     content_disposition = f"attachment; filename*=UTF-8''{quoted_zip_name}"
-    return StreamingResponse(iterfile(), media_type="application/zip", headers={"Content-Disposition": content_disposition})
+    return StreamingResponse(count_streamed(iter_media_zip(urls), "download_media"), media_type="application/zip", headers={"Content-Disposition": content_disposition})
 
-@app.get("/download-temp-zip")
-def download_temp_zip(dir: str, zip: str):
+ZIP_SEND_CHUNK_SIZE = int(os.environ.get("ZIP_SEND_CHUNK_SIZE", str(1024 * 1024)))  # bytes
+
+class ZipFileResponse(FileResponse):
+    """
+    Finished ZIPs on disk. FileResponse answers Range / If-Range requests (206 with
+    Content-Range, 416 when unsatisfiable) and sets Content-Length, Accept-Ranges,
+    ETag and Last-Modified, so interrupted downloads can resume. Servers that offer
+    the ASGI pathsend extension send full files with sendfile; otherwise the file
+    is read in ZIP_SEND_CHUNK_SIZE chunks.
+    """
+    chunk_size = ZIP_SEND_CHUNK_SIZE
+
+    def __init__(self, path, filename, endpoint):
+        super().__init__(path, media_type="application/zip", filename=filename)
+        self.endpoint = endpoint
+
+    async def __call__(self, scope, receive, send):
+        sent = 0
+        async def counting_send(message):
+            nonlocal sent
+            if message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            elif message["type"] == "http.response.pathsend":
+                sent += int(self.headers["content-length"])
+            await send(message)
+        try:
+            await super().__call__(scope, receive, counting_send)
+        finally:
+            BYTES_STREAMED.labels(self.endpoint).observe(sent)
+
+@app.api_route("/download-temp-zip", methods=["GET", "HEAD"])
+async def download_temp_zip(dir: str, zip: str):
     temp_dir = os.path.join(tempfile.gettempdir(), dir)
     zip_path = os.path.join(temp_dir, zip)
     if not os.path.exists(zip_path):
         raise HTTPException(status_code=404, detail="ZIP file not found or expired.")
-    def iterfile():
-        with open(zip_path, "rb") as f:
-            while True:
-                chunk = f.read(8192)
-                if not chunk:
-                    break
-                yield chunk
-    return StreamingResponse(iterfile(), media_type="application/zip", headers={"Content-Disposition": f"attachment; filename={zip}"})
+    return ZipFileResponse(zip_path, zip, "download_temp_zip")
 
 @app.delete("/delete-temp-zip")
 def delete_temp_zip(dir: str, zip: str):
@@ -296,125 +1242,927 @@ def delete_temp_zip(dir: str, zip: str):
     return {"status": "deleted"}
 
 @app.get("/")
-def root():
+async def root():
     return {"message": "AudioBreak Scraper API"}
 
+@app.get("/cache-stats")
+def cache_stats():
+    return {"documents": document_cache.stats(), "media": media_cache.stats()}
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus metrics in the text exposition format.
+    """
+    # Sync routes run on anyio's thread pool, whose limiter is only reachable from the event loop
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    POOL_WORKERS.labels("starlette").set(limiter.total_tokens)
+    POOL_TASKS.labels("starlette").set(limiter.borrowed_tokens + limiter.statistics().tasks_waiting)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.post("/scrape-metadata")
-def scrape_metadata(request: ScrapeRequest):
+async def scrape_metadata(request: ScrapeRequest, raw_html: str = "truncated"):
     """
     Initial endpoint to detect pagination links and provide metadata for UI configuration.
+    raw_html is "truncated" (first METADATA_RAW_HTML_LIMIT bytes), "full" or "none".
     """
+    if raw_html not in METADATA_RAW_HTML_MODES:
+        raise HTTPException(status_code=400, detail=f"Unsupported raw_html: {raw_html}. Use 'truncated', 'full' or 'none'.")
+    parser = resolve_html_parser(request.parser)
     try:
-        response = requests.get(request.url, headers=HEADERS)
-        response.raise_for_status()
-        html = response.content
-        soup = BeautifulSoup(html, "html.parser")
+        doc = await document_cache.get(request.url, parser)
     except Exception as e:
         return {"error": str(e)}
+    return await run_blocking(page_metadata, request, doc, raw_html)
 
-    # Try to detect possible pagination links/selectors
-    pagination_candidates = []
-    for selector in ["a.next", ".next", "a[rel=next]", "li.next a", "a[aria-label=Next]", "a[title=Next]", "a[rel=page]", "a.page-link"]:
-        found = soup.select(selector)
-        if found:
-            pagination_candidates.append({
-                "selector": selector,
-                "count": len(found),
-                "examples": [a.get('href') for a in found[:3] if a.get('href')]
-            })
+PAGINATION_SELECTORS = ["a.next", ".next", "a[rel=next]", "li.next a", "a[aria-label=Next]", "a[title=Next]", "a[rel=page]", "a.page-link"]
+MAIN_SELECTORS = ['main', '#main', '.main', '#content', '.content', 'article', '.article', '#primary']
+PAGINATION_MATCHERS = [(sel, soupsieve.compile(sel)) for sel in PAGINATION_SELECTORS]
+MAIN_MATCHERS = [(sel, soupsieve.compile(sel)) for sel in MAIN_SELECTORS]
+# One selector list covering every candidate, matched during the tree walk instead of one scan per selector
+METADATA_SELECTOR = soupsieve.compile(", ".join(PAGINATION_SELECTORS + MAIN_SELECTORS))
 
-    # Heuristic: find links with similar URLs to the initial URL (likely pagination)
-    from urllib.parse import urlparse, urljoin
-    import re
+def selector_subjects(selectors):
+    """
+    Tag names, classes and ids an element needs one of to possibly match any of the selectors,
+    so the (slow) selector match only runs on those. Returns None when a selector can't be narrowed.
+    """
+    tags, classes, ids = set(), set(), set()
+    for selector in selectors:
+        subject = selector.split()[-1]
+        tag = re.match(r'[\w-]+', subject)
+        if tag:
+            tags.add(tag.group())
+            continue
+        subject_classes = re.findall(r'\.([\w-]+)', subject)
+        subject_ids = re.findall(r'#([\w-]+)', subject)
+        if not subject_classes and not subject_ids:
+            return None
+        classes.update(subject_classes)
+        ids.update(subject_ids)
+    return tags, classes, ids
+
+METADATA_SUBJECTS = selector_subjects(PAGINATION_SELECTORS + MAIN_SELECTORS)
+
+def metadata_candidate(tag):
+    if METADATA_SUBJECTS is None:
+        return True
+    tags, classes, ids = METADATA_SUBJECTS
+    if tag.name in tags or tag.get('id') in ids:
+        return True
+    tag_classes = tag.get('class')
+    return bool(tag_classes) and not classes.isdisjoint(tag_classes)
+SIMILAR_LINK_PATTERN = re.compile(r'(page|p=|[0-9]{1,3})', re.IGNORECASE)
+METADATA_RAW_HTML_MODES = ("truncated", "full", "none")
+METADATA_RAW_HTML_LIMIT = int(os.environ.get("METADATA_RAW_HTML_LIMIT", str(64 * 1024)))  # bytes
+METADATA_TEXT_LIMIT = 500
+
+def page_metadata(request: ScrapeRequest, doc, raw_html="truncated"):
+    """
+    Builds the /scrape-metadata response from a fetched document. Element counts,
+    media type detection and similar links all come from a single walk of the tree.
+    """
+    html = doc['content']
+    soup = doc['soup']
+
+    # One pass over the tree for counts, media types, selector matches and pagination-like links
     base_url = request.url
     parsed_base = urlparse(base_url)
     base_netloc = parsed_base.netloc
     base_path = parsed_base.path.rstrip('/')
+    counts = {'img': 0, 'audio': 0, 'video': 0, 'a': 0}
+    media_types = set()
     similar_links = []
-    for a in soup.find_all('a', href=True):
-        href = a['href']
-        abs_href = urljoin(base_url, href)
-        parsed_href = urlparse(abs_href)
-        if parsed_href.netloc == base_netloc and parsed_href.path.startswith(base_path):
-            if re.search(r'(page|p=|[0-9]{1,3})', abs_href, re.IGNORECASE):
-                similar_links.append(abs_href)
+    matched = []
+    for tag in soup.find_all(True):
+        if metadata_candidate(tag) and METADATA_SELECTOR.match(tag):
+            matched.append(tag)
+        name = tag.name
+        if name in counts:
+            counts[name] += 1
+        if name == 'img':
+            media_types.add('img')
+            src = tag.get('src')
+            if src and src.lower().endswith('.svg'):
+                media_types.add('svg')
+        elif name == 'audio' or name == 'video':
+            media_types.add(name)
+        elif name == 'source':
+            parent = source_parent(tag)
+            if parent == 'audio' or parent == 'video':
+                media_types.add(parent)
+        elif name == 'object':
+            data = tag.get('data')
+            if data and data.lower().endswith('.svg'):
+                media_types.add('svg')
+        elif name == 'a':
+            href = tag.get('href')
+            if href is None:
+                continue
+            if href.lower().endswith('.pdf'):
+                media_types.add('pdf')
+            # Heuristic: links with similar URLs to the initial URL (likely pagination)
+            abs_href = urljoin(base_url, href)
+            parsed_href = urlparse(abs_href)
+            if parsed_href.netloc == base_netloc and parsed_href.path.startswith(base_path):
+                if SIMILAR_LINK_PATTERN.search(abs_href):
+                    similar_links.append(abs_href)
     similar_links = list(dict.fromkeys(similar_links))[:10]
 
-    # Detect available media types
-    media_types = set()
-    if soup.find('img'): media_types.add('img')
-    if soup.find('audio') or any((t for t in soup.find_all('source') if t.parent and getattr(t.parent, 'name', None) == 'audio')): media_types.add('audio')
-    if soup.find('video') or any((t for t in soup.find_all('source') if t.parent and getattr(t.parent, 'name', None) == 'video')): media_types.add('video')
-    if soup.find('a', href=lambda h: h and h.lower().endswith('.pdf')): media_types.add('pdf')
-    if soup.find('img', src=lambda s: s and s.lower().endswith('.svg')) or soup.find('object', data=lambda d: d and d.lower().endswith('.svg')): media_types.add('svg')
+    # Try to detect possible pagination links/selectors
+    pagination_candidates = []
+    for selector, matcher in PAGINATION_MATCHERS:
+        found = [el for el in matched if matcher.match(el)]
+        if found:
+            pagination_candidates.append({
+                "selector": selector,
+                "count": len(found),
+                "examples": [a.get('href') for a in found[:3] if a.get('href')]
+            })
 
     # Suggest main content selectors
-    main_selectors = []
-    for sel in ['main', '#main', '.main', '#content', '.content', 'article', '.article', '#primary']:
-        if soup.select_one(sel):
-            main_selectors.append(sel)
+    main_selectors = [sel for sel, matcher in MAIN_MATCHERS if any(matcher.match(el) for el in matched)]
 
-    # Debug info: count elements and show first 500 chars of text
+    # Only as much text as the preview needs, instead of get_text() over the whole page
+    text = []
+    text_length = 0
+    for string in soup.strings:
+        text.append(string)
+        text_length += len(string)
+        if text_length >= METADATA_TEXT_LIMIT:
+            break
+    title = soup.title.string.strip() if soup.title and soup.title.string else None
     debug_info = {
-        "parsed_title": soup.title.string.strip() if soup.title and soup.title.string else None,
-        "img_count": len(soup.find_all('img')),
-        "audio_count": len(soup.find_all('audio')),
-        "video_count": len(soup.find_all('video')),
-        "a_count": len(soup.find_all('a')),
-        "first_500_text": soup.get_text()[:500]
+        "parsed_title": title,
+        "img_count": counts['img'],
+        "audio_count": counts['audio'],
+        "video_count": counts['video'],
+        "a_count": counts['a'],
+        "first_500_text": "".join(text)[:METADATA_TEXT_LIMIT]
     }
+    raw_html_truncated = raw_html == "truncated" and len(html) > METADATA_RAW_HTML_LIMIT
+    if raw_html == "none":
+        raw = None
+    else:
+        raw = html[:METADATA_RAW_HTML_LIMIT] if raw_html_truncated else html
+        raw = raw.decode(errors='replace') if isinstance(raw, bytes) else raw
     return {
         "pagination_candidates": pagination_candidates,
         "pagination_similar_links": similar_links,
         "media_types": list(media_types),
         "main_selectors": main_selectors,
-        "title": soup.title.string.strip() if soup.title and soup.title.string else None,
-        "raw_html": html.decode(errors='replace') if isinstance(html, bytes) else html,
+        "title": title,
+        "raw_html": raw,
+        "raw_html_truncated": raw_html_truncated,
         "debug": debug_info
     }
 
-# In-memory progress store (for demo; use Redis for production)
-progress_store = {}
-progress_store_lock = threading.Lock()
+# Background download jobs fetch files in parallel, bounded globally and per host
+DOWNLOAD_MAX_WORKERS = int(os.environ.get("DOWNLOAD_MAX_WORKERS", "8"))
+DOWNLOAD_MAX_PER_HOST = int(os.environ.get("DOWNLOAD_MAX_PER_HOST", "4"))
+
+download_executor = InstrumentedExecutor("download", DOWNLOAD_MAX_WORKERS)
+download_host_slot = HostSlots(DOWNLOAD_MAX_PER_HOST)
+
+# Downloaded media is kept in a content-addressed cache shared by all jobs
+MEDIA_CACHE_DIR = os.environ.get("MEDIA_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "audiobreak-media-cache")
+MEDIA_CACHE_MAX_BYTES = int(os.environ.get("MEDIA_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+MEDIA_CACHE_PIN_SECONDS = 600  # lease on a blob in use, renewed every JOB_HEARTBEAT_SECONDS
+
+class MediaCache:
+    """
+    On-disk, content-addressed cache of downloaded media.
+
+    Bodies are stored once per SHA-256 under blobs/, and an SQLite index maps each
+    URL to its blob and validators (ETag, Last-Modified). A cached URL is revalidated
+    with a conditional GET and served from disk on 304. Blobs are evicted least
+    recently used first once the cache grows past `max_bytes`.
+
+    A blob handed out by fetch() is pinned against eviction until release() is called.
+    Pins are leases in the index, so every process sharing the cache respects them.
+    A process renews its leases with renew_pins(); those of a process that died expire
+    after MEDIA_CACHE_PIN_SECONDS.
+    """
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(root, "blobs"), exist_ok=True)
+        os.makedirs(os.path.join(root, "tmp"), exist_ok=True)
+        self.db_path = os.path.join(root, "index.sqlite3")
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.pins = {}
+        self.owner = uuid.uuid4().hex  # this process's name on its leases
+        self.counters = {'hits': 0, 'misses': 0, 'deduplicated': 0, 'evictions': 0}
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, sha256 TEXT NOT NULL, etag TEXT, last_modified TEXT)")
+        conn.execute("CREATE TABLE IF NOT EXISTS blobs (sha256 TEXT PRIMARY KEY, size INTEGER NOT NULL, last_used REAL NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS pins (sha256 TEXT NOT NULL, owner TEXT NOT NULL, pinned_until REAL NOT NULL, PRIMARY KEY (sha256, owner))")
+        self.remove_orphans()
+
+    def remove_orphans(self):
+        """
+        Removes partial downloads left in tmp/ by a process that stopped mid-download.
+        Other processes may be downloading right now, so only files that have not been
+        written to for MEDIA_CACHE_PIN_SECONDS are removed.
+        """
+        tmp_dir = os.path.join(self.root, "tmp")
+        cutoff = time.time() - MEDIA_CACHE_PIN_SECONDS
+        for name in os.listdir(tmp_dir):
+            path = os.path.join(tmp_dir, name)
+            try:
+                if name.endswith(".part") and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _conn(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self.local.conn = conn
+        return conn
+
+    def blob_path(self, sha256):
+        return os.path.join(self.root, "blobs", sha256[:2], sha256)
+
+    def fetch(self, url, on_progress):
+        """
+        Returns (path, sha256) of the cached body of `url`, downloading it only if it
+        is not cached or has changed. on_progress(received, total) is called as for
+        a download; a revalidated file reports its full size at once.
+        """
+        conn = self._conn()
+        row = conn.execute("SELECT sha256, etag, last_modified FROM urls WHERE url = ?", (url,)).fetchone()
+        headers = {}
+        if row and os.path.exists(self.blob_path(row[0])):
+            if row[1]:
+                headers['If-None-Match'] = row[1]
+            if row[2]:
+                headers['If-Modified-Since'] = row[2]
+        with download_host_slot(url):
+            with http_get(url, headers=headers or None, stream=True) as r:
+                if headers and r.status_code == 304:
+                    sha256 = row[0]
+                    self._pin(sha256)
+                    try:
+                        size = os.path.getsize(self.blob_path(sha256))
+                        on_progress(0, size)
+                        on_progress(size, size)
+                    except BaseException:
+                        self.release(sha256)
+                        raise
+                    conn.execute("UPDATE blobs SET last_used = ? WHERE sha256 = ?", (time.time(), sha256))
+                    with self.lock:
+                        self.counters['hits'] += 1
+                    return self.blob_path(sha256), sha256
+                r.raise_for_status()
+                length = r.headers.get('Content-Length')
+                total = int(length) if length and length.isdigit() else None
+                tmp_path = os.path.join(self.root, "tmp", f"{uuid.uuid4()}.part")
+                digest = hashlib.sha256()
+                received = 0
+                on_progress(received, total)
+                try:
+                    with open(tmp_path, 'wb') as f:
+                        for chunk in r.iter_content(ZIP_CHUNK_SIZE):
+                            f.write(chunk)
+                            digest.update(chunk)
+                            received += len(chunk)
+                            on_progress(received, total)
+                except BaseException:
+                    os.remove(tmp_path)
+                    raise
+                etag = r.headers.get('ETag')
+                last_modified = r.headers.get('Last-Modified')
+        sha256 = digest.hexdigest()
+        path = self.blob_path(sha256)
+        self._pin(sha256)
+        if os.path.exists(path):
+            # Same bytes under another URL (or unchanged without validators)
+            os.remove(tmp_path)
+            with self.lock:
+                self.counters['deduplicated'] += 1
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        conn.execute("INSERT OR REPLACE INTO blobs (sha256, size, last_used) VALUES (?, ?, ?)", (sha256, received, time.time()))
+        conn.execute("INSERT OR REPLACE INTO urls (url, sha256, etag, last_modified) VALUES (?, ?, ?, ?)", (url, sha256, etag, last_modified))
+        with self.lock:
+            self.counters['misses'] += 1
+        self.evict()
+        return path, sha256
+
+    def _pin(self, sha256):
+        with self.lock:
+            count = self.pins.get(sha256, 0) + 1
+            self.pins[sha256] = count
+            if count == 1:
+                self._conn().execute(
+                    "INSERT OR REPLACE INTO pins (sha256, owner, pinned_until) VALUES (?, ?, ?)",
+                    (sha256, self.owner, time.time() + MEDIA_CACHE_PIN_SECONDS),
+                )
+
+    def release(self, sha256):
+        with self.lock:
+            count = self.pins.get(sha256, 0) - 1
+            if count > 0:
+                self.pins[sha256] = count
+            else:
+                self.pins.pop(sha256, None)
+                self._conn().execute("DELETE FROM pins WHERE sha256 = ? AND owner = ?", (sha256, self.owner))
+
+    def renew_pins(self):
+        """
+        Extends the leases on the blobs this process has pinned.
+        """
+        with self.lock:
+            self._conn().execute(
+                "UPDATE pins SET pinned_until = ? WHERE owner = ?",
+                (time.time() + MEDIA_CACHE_PIN_SECONDS, self.owner),
+            )
+
+    def evict(self):
+        """
+        Removes least recently used blobs until the cache fits in max_bytes.
+        """
+        conn = self._conn()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        now = time.time()
+        conn.execute("DELETE FROM pins WHERE pinned_until < ?", (now,))
+        for sha256, size in conn.execute("SELECT sha256, size FROM blobs ORDER BY last_used").fetchall():
+            if total <= self.max_bytes:
+                break
+            # Checked and deleted in one write transaction, so no process can pin the
+            # blob in between
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute("SELECT 1 FROM pins WHERE sha256 = ? AND pinned_until >= ?", (sha256, now)).fetchone():
+                    continue
+                conn.execute("DELETE FROM urls WHERE sha256 = ?", (sha256,))
+                conn.execute("DELETE FROM blobs WHERE sha256 = ?", (sha256,))
+            finally:
+                conn.execute("COMMIT")
+            with self.lock:
+                self.counters['evictions'] += 1
+            try:
+                os.remove(self.blob_path(sha256))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def stats(self):
+        count, size = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        with self.lock:
+            return dict(self.counters, blobs=count, bytes=size, max_bytes=self.max_bytes)
+
+media_cache = MediaCache(MEDIA_CACHE_DIR, MEDIA_CACHE_MAX_BYTES)
+
+# Admission: before a job downloads anything, each file is probed for its size and type.
+# Files over budget or that are not media are skipped, so the job's total is known up front.
+DOWNLOAD_MAX_FILE_BYTES = int(os.environ.get("DOWNLOAD_MAX_FILE_BYTES", str(2 * 1024 ** 3)))
+DOWNLOAD_MAX_JOB_BYTES = int(os.environ.get("DOWNLOAD_MAX_JOB_BYTES", str(10 * 1024 ** 3)))
+REJECTED_CONTENT_TYPES = {"text/html"}  # error and login pages served in place of media
+
+class DownloadTooLarge(Exception):
+    pass
+
+def response_size(response):
+    """
+    Full size of the resource from a 206's Content-Range or a 200's Content-Length, if given.
+    """
+    if response.status_code == 206:
+        total = response.headers.get('Content-Range', '').rsplit('/', 1)[-1]
+    else:
+        total = response.headers.get('Content-Length', '')
+    return int(total) if total.isdigit() else None
+
+def response_content_type(response):
+    return response.headers.get('Content-Type', '').split(';')[0].strip().lower() or None
+
+def probe_media(url):
+    """
+    Returns (status, size, content_type) for `url` from a HEAD request, or from a
+    one-byte Range GET when HEAD is refused or does not report a size.
+    """
+    with download_host_slot(url):
+        try:
+            response = http_head(url)
+            response.close()
+            size = response_size(response) if response.ok else None
+            if size is not None:
+                return response.status_code, size, response_content_type(response)
+        except requests.RequestException:
+            pass
+        with http_get(url, headers={'Range': 'bytes=0-0'}, stream=True) as response:
+            return response.status_code, response_size(response), response_content_type(response)
+
+def job_files(urls):
+    """
+    The progress entry of each requested URL. Repeats of a URL already in the job are
+    skipped, URLs that cannot be parsed are marked as errors, and every file gets a
+    name no other file in the ZIP uses.
+    """
+    files = []
+    seen = set()
+    names = set()
+    for url in urls:
+        file = {'url': url, 'name': url.rsplit("/", 1)[-1] or "file", 'state': 'queued', 'bytes': 0, 'total': None,
+                'content_type': None, 'error': None}
+        try:
+            file['name'] = media_filename(url)
+            key = canonical_url(url)
+        except ValueError as e:
+            file['state'] = 'error'
+            file['error'] = f"Invalid URL: {e}"
+        else:
+            if key in seen:
+                file['state'] = 'skipped'
+                file['error'] = "Duplicate URL"
+            else:
+                seen.add(key)
+                file['name'] = unique_name(file['name'], names)
+        files.append(file)
+    return files
+
+def admit_files(files, max_file_bytes, max_job_bytes):
+    """
+    Probes the queued files concurrently and marks those that should not be downloaded
+    as 'skipped' (or 'error' when the server refuses them). Files are admitted in job
+    order until max_job_bytes; returns the total size of the admitted files that
+    reported one.
+    """
+    futures = [(file, download_executor.submit(probe_media, file['url'])) for file in files if file['state'] == 'queued']
+    admitted = 0
+    for file, future in futures:
+        try:
+            status, size, content_type = future.result()
+        except Exception:
+            status, size, content_type = None, None, None  # let the download itself report the failure
+        file['total'] = size
+        file['content_type'] = content_type
+        if status and status >= 400 and status != 416:
+            file['state'], file['error'] = 'error', f"HTTP {status}"
+        elif content_type in REJECTED_CONTENT_TYPES:
+            file['state'], file['error'] = 'skipped', f"Not a media file ({content_type})"
+        elif size is not None and size > max_file_bytes:
+            file['state'], file['error'] = 'skipped', f"Larger than the {max_file_bytes} byte file limit"
+        elif size is not None and admitted + size > max_job_bytes:
+            file['state'], file['error'] = 'skipped', f"Over the {max_job_bytes} byte job limit"
+        else:
+            admitted += size or 0
+    return admitted
+
+def check_disk_space(estimate):
+    """
+    Raises if the downloads (media cache) and the ZIP (temp dir) may not fit on disk.
+    """
+    import shutil
+    needed = {}
+    for path in (media_cache.root, tempfile.gettempdir()):
+        device = os.stat(path).st_dev
+        needed[device] = (path, needed.get(device, (path, 0))[1] + estimate)
+    for path, need in needed.values():
+        free = shutil.disk_usage(path).free
+        if need > free:
+            raise RuntimeError(f"Not enough disk space: about {need // 1024 ** 2} MB needed in {path}, {free // 1024 ** 2} MB free")
+
+# Job store: progress records for background download jobs. The default SQLite
+# store lives on local disk, so every uvicorn worker process on the host sees the
+# same jobs; JOB_STORE_URL=redis://... shares them across hosts.
+JOB_STORE_URL = os.environ.get("JOB_STORE_URL") or "sqlite:///" + os.path.join(tempfile.gettempdir(), "audiobreak-jobs.sqlite3")
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.environ.get("JOB_QUEUE_SIZE", "64"))
+PROGRESS_FLUSH_SECONDS = 0.25
+
+class JobStore(abc.ABC):
+    """
+    Interface for job progress records. Records are JSON-serializable dicts, and
+    implementations must be safe to share between threads and processes.
+    """
+    @abc.abstractmethod
+    def create(self, job_id, record):
+        ...
 
-# Track job start/last update time
-CLEANUP_INTERVAL_SECONDS = 3600  # 1 hour
-STALE_JOB_SECONDS = 3600 * 2     # 2 hours
+    @abc.abstractmethod
+    def get(self, job_id):
+        """
+        Returns the record for `job_id`, or None if there is no such job.
+        """
 
-def cleanup_progress_store():
+    @abc.abstractmethod
+    def update(self, job_id, fields):
+        """
+        Merges `fields` into the record, bumps its `version`, and returns it.
+        Returns None if the job is gone.
+        """
+
+    @abc.abstractmethod
+    def delete(self, job_id):
+        ...
+
+    @abc.abstractmethod
+    def items(self):
+        """
+        Returns a list of (job_id, record) pairs for every job.
+        """
+
+    def count(self):
+        return len(self.items())
+
+class SQLiteJobStore(JobStore):
+    """
+    Durable local job store: one JSON record per row in a WAL-mode SQLite database,
+    which lets readers in other processes run alongside the writing worker.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self._conn().execute("CREATE TABLE IF NOT EXISTS jobs (job_id TEXT PRIMARY KEY, record TEXT NOT NULL)")
+
+    def _conn(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def create(self, job_id, record):
+        self._conn().execute("INSERT OR REPLACE INTO jobs (job_id, record) VALUES (?, ?)", (job_id, json.dumps(record)))
+
+    def get(self, job_id):
+        row = self._conn().execute("SELECT record FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update(self, job_id, fields):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT record FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            record = json.loads(row[0])
+            version = record.get('version', 0) + 1
+            record.update(fields)
+            record['version'] = version
+            conn.execute("UPDATE jobs SET record = ? WHERE job_id = ?", (json.dumps(record), job_id))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return record
+
+    def delete(self, job_id):
+        self._conn().execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def items(self):
+        rows = self._conn().execute("SELECT job_id, record FROM jobs").fetchall()
+        return [(job_id, json.loads(record)) for job_id, record in rows]
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+class RedisJobStore(JobStore):
+    """
+    Job store shared across hosts. Needs the optional `redis` package; any client
+    with the redis-py API (such as fakeredis) can be passed in instead of a URL.
+    """
+    prefix = "audiobreak:job:"
+
+    def __init__(self, url=None, client=None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.redis = client
+
+    def create(self, job_id, record):
+        self.redis.set(self.prefix + job_id, json.dumps(record))
+
+    def get(self, job_id):
+        raw = self.redis.get(self.prefix + job_id)
+        return json.loads(raw) if raw else None
+
+    def update(self, job_id, fields):
+        key = self.prefix + job_id
+        result = {}
+        def merge(pipe):
+            raw = pipe.get(key)
+            if not raw:
+                result['record'] = None
+                return
+            record = json.loads(raw)
+            version = record.get('version', 0) + 1
+            record.update(fields)
+            record['version'] = version
+            pipe.multi()
+            pipe.set(key, json.dumps(record))
+            result['record'] = record
+        self.redis.transaction(merge, key)
+        return result['record']
+
+    def delete(self, job_id):
+        self.redis.delete(self.prefix + job_id)
+
+    def items(self):
+        pairs = []
+        for key in self.redis.scan_iter(match=self.prefix + "*"):
+            raw = self.redis.get(key)
+            if raw:
+                key = key.decode() if isinstance(key, bytes) else key
+                pairs.append((key[len(self.prefix):], json.loads(raw)))
+        return pairs
+
+    def count(self):
+        return sum(1 for _ in self.redis.scan_iter(match=self.prefix + "*"))
+
+def make_job_store(url):
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisJobStore(url)
+    if url.startswith("sqlite:///"):
+        return SQLiteJobStore(url[len("sqlite:///"):])
+    raise ValueError(f"Unsupported JOB_STORE_URL: {url}")
+
+job_store = make_job_store(JOB_STORE_URL)
+JOB_STORE_JOBS.set_function(job_store.count)
+
+# Progress streams wake on job updates instead of polling. Updates made in this
+# process are pushed immediately; jobs running in another process are re-read
+# every PROGRESS_RESYNC_SECONDS.
+PROGRESS_HEARTBEAT_SECONDS = float(os.environ.get("PROGRESS_HEARTBEAT_SECONDS", "15"))
+PROGRESS_RESYNC_SECONDS = float(os.environ.get("PROGRESS_RESYNC_SECONDS", "2"))
+
+class JobEvents:
+    """
+    In-process job update notifications. publish() may be called from any thread;
+    subscribers are asyncio.Events set on the event loop that is waiting on them.
+    """
+    def __init__(self):
+        self.subscribers = {}  # job_id -> set of (loop, asyncio.Event)
+        self.local_jobs = set()  # jobs queued or running in this process
+        self.lock = threading.Lock()
+
+    def publish(self, job_id):
+        with self.lock:
+            subscribers = list(self.subscribers.get(job_id, ()))
+        for loop, event in subscribers:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # loop already closed
+
+    @contextlib.contextmanager
+    def subscribe(self, job_id):
+        subscriber = (asyncio.get_running_loop(), asyncio.Event())
+        with self.lock:
+            self.subscribers.setdefault(job_id, set()).add(subscriber)
+        try:
+            yield subscriber[1]
+        finally:
+            with self.lock:
+                subscribers = self.subscribers.get(job_id)
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self.subscribers[job_id]
+
+    def is_local(self, job_id):
+        with self.lock:
+            return job_id in self.local_jobs
+
+    def set_local(self, job_id, local):
+        with self.lock:
+            if local:
+                self.local_jobs.add(job_id)
+            else:
+                self.local_jobs.discard(job_id)
+
+    def local(self):
+        with self.lock:
+            return set(self.local_jobs)
+
+job_events = JobEvents()
+
+def update_job(job_id, fields):
+    """
+    Writes `fields` to the job store and wakes any progress streams for the job.
+    """
+    record = job_store.update(job_id, fields)
+    job_events.publish(job_id)
+    return record
+
+# Finished ZIPs stay downloadable (and resumable) until they have been idle for
+# STALE_JOB_SECONDS, counted from the job finishing or the last download request.
+STALE_JOB_SECONDS = int(os.environ.get("JOB_RETENTION_SECONDS", str(3600 * 2)))  # 2 hours
+CLEANUP_INTERVAL_SECONDS = min(3600, STALE_JOB_SECONDS)  # at most 1 hour
+
+def discard_job(job_id, prog):
+    """
+    Deletes a job record and, once the job has finished or failed, its temp dir. A job
+    that is still running notices the missing record on its next progress flush and
+    removes its own temp dir.
+    """
+    temp_dir = prog.get('temp_dir')
+    if (prog.get('ready') or prog.get('error')) and temp_dir and os.path.exists(temp_dir):
+        import shutil
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    job_store.delete(job_id)
+
+def remove_stale_jobs():
+    now = time.time()
+    for job_id, prog in job_store.items():
+        # If job is not ready and status is not 'ready', skip
+        if not prog.get('ready') and prog.get('status') != 'ready' and not prog.get('error'):
+            continue  # still active
+        # If job is ready but not downloaded for a long time, or error
+        last_used = max(prog.get('last_update', now), prog.get('last_download') or 0)
+        if now - last_used > STALE_JOB_SECONDS:
+            discard_job(job_id, prog)
+
+def cleanup_job_store():
     while True:
         time.sleep(CLEANUP_INTERVAL_SECONDS)
-        now = datetime.datetime.utcnow().timestamp()
-        with progress_store_lock:
-            stale_jobs = []
-            for job_id, prog in list(progress_store.items()):
-                # If job is not ready and status is not 'ready', skip
-                if not prog.get('ready') and prog.get('status') != 'ready':
-                    continue  # still active
-                # If job is ready but not downloaded for a long time, or error
-                last_update = prog.get('last_update', now)
-                if now - last_update > STALE_JOB_SECONDS:
-                    # Remove temp dir if exists
-                    temp_dir = prog.get('temp_dir')
-                    if temp_dir and os.path.exists(temp_dir):
-                        import shutil
-                        shutil.rmtree(temp_dir, ignore_errors=True)
-                    stale_jobs.append(job_id)
-            for job_id in stale_jobs:
-                progress_store.pop(job_id, None)
-
-# Start cleanup thread on app startup
-threading.Thread(target=cleanup_progress_store, daemon=True).start()
+        remove_stale_jobs()
+
+# The job queue lives in memory, so jobs queued or running in a process that exited
+# (restart, crash) never finish. Every process refreshes last_update on the jobs it
+# holds; an unfinished job nobody has refreshed for ABANDONED_JOB_SECONDS is marked
+# as failed, which ends its progress streams and hands it to the cleanup above.
+JOB_HEARTBEAT_SECONDS = 60
+ABANDONED_JOB_SECONDS = int(os.environ.get("ABANDONED_JOB_SECONDS", "600"))  # 10 minutes
+
+def fail_abandoned_jobs():
+    now = time.time()
+    local_jobs = job_events.local()
+    for job_id in local_jobs:
+        job_store.update(job_id, {'last_update': now})
+    for job_id, prog in job_store.items():
+        if prog.get('ready') or prog.get('error') or job_id in local_jobs:
+            continue
+        if now - prog.get('last_update', now) > ABANDONED_JOB_SECONDS:
+            update_job(job_id, {'status': 'error', 'error': "Interrupted: the server stopped before the job finished", 'last_update': now})
+
+def watch_abandoned_jobs():
+    while True:
+        try:
+            fail_abandoned_jobs()
+        except Exception as e:
+            print(f"Abandoned job check failed: {e}")
+        # The same heartbeat keeps this process's media cache pins from expiring
+        try:
+            media_cache.renew_pins()
+        except Exception as e:
+            print(f"Media cache pin renewal failed: {e}")
+        time.sleep(JOB_HEARTBEAT_SECONDS)
+
+# Start cleanup threads on app startup
+threading.Thread(target=cleanup_job_store, daemon=True).start()
+threading.Thread(target=watch_abandoned_jobs, daemon=True).start()
+
+# Bounded job queue: JOB_WORKERS threads run jobs, and submissions beyond
+# JOB_QUEUE_SIZE waiting jobs are rejected instead of piling up threads.
+job_queue = queue.Queue(maxsize=JOB_QUEUE_SIZE)
+JOB_QUEUE_DEPTH.set_function(job_queue.qsize)
+
+def job_worker_loop():
+    while True:
+        job_id, target, args = job_queue.get()
+        try:
+            with ACTIVE_JOBS.track_inprogress():
+                target(job_id, *args)
+        except Exception as e:
+            update_job(job_id, {'status': 'error', 'error': str(e), 'last_update': time.time()})
+        finally:
+            job_events.set_local(job_id, False)
+            job_queue.task_done()
+
+for _ in range(JOB_WORKERS):
+    threading.Thread(target=job_worker_loop, daemon=True).start()
+
+def run_download_job(job_id, zip_name):
+    """
+    Downloads the job's files into a ZIP, keeping the job's progress record up to date.
+    """
+    prog = job_store.get(job_id)
+    if prog is None:
+        return  # deleted while queued
+    files = prog['files']
+    lock = threading.Lock()
+    last_flush = [0.0]
+    def flush(force=False):
+        # Called with `lock` held. Progress is written at most every PROGRESS_FLUSH_SECONDS
+        # unless forced; returns False once the job has been deleted.
+        now = time.time()
+        if not force and now - last_flush[0] < PROGRESS_FLUSH_SECONDS:
+            return True
+        last_flush[0] = now
+        prog['last_update'] = now
+        return update_job(job_id, prog) is not None
+    with lock:
+        prog['status'] = "Checking Files"
+        if not flush(force=True):
+            return
+    max_file_bytes = prog['max_file_bytes']
+    max_job_bytes = prog['max_job_bytes']
+    estimate = admit_files(files, max_file_bytes, max_job_bytes)
+    check_disk_space(estimate)
+    with lock:
+        prog['bytes_total'] = estimate
+        prog['current'] = sum(1 for file in files if file['state'] != 'queued')
+        prog['status'] = "Downloading Files"
+        if not flush(force=True):
+            return  # deleted while its files were checked
+    temp_dir = tempfile.mkdtemp()
+    started = time.time()
+    with lock:
+        prog['temp_dir'] = temp_dir
+        flush(force=True)
+    def track(idx):
+        def on_progress(received, total):
+            with lock:
+                file = files[idx]
+                if file['state'] == 'queued':
+                    file['state'] = 'downloading'
+                    if file['total'] is None and total:
+                        # Size not known at admission: count it now
+                        file['total'] = total
+                        prog['bytes_total'] += total
+                prog['bytes_downloaded'] += received - file['bytes']
+                file['bytes'] = received
+                prog['throughput'] = int(prog['bytes_downloaded'] / max(time.time() - started, 0.001))
+                flush()
+                # Sizes reported at admission can be missing or wrong, so the budgets also hold while downloading
+                if received > max_file_bytes:
+                    raise DownloadTooLarge(f"Larger than the {max_file_bytes} byte file limit")
+                if prog['bytes_downloaded'] > max_job_bytes:
+                    raise DownloadTooLarge(f"Over the {max_job_bytes} byte job limit")
+        return on_progress
+    # Files are fetched in parallel into the media cache (unchanged ones are only
+    # revalidated) and added to the ZIP as each one completes.
+    futures = {}
+    for idx, file in enumerate(files):
+        if file['state'] == 'queued':
+            futures[download_executor.submit(media_cache.fetch, file['url'], track(idx))] = idx
+    zip_path = os.path.join(temp_dir, zip_name)
+    cancelled = False
+    with zipfile.ZipFile(zip_path, "w", allowZip64=True) as zf:
+        for future in as_completed(futures):
+            idx = futures[future]
+            name = files[idx]['name']
+            try:
+                blob_path, sha256 = future.result()
+                try:
+                    if not cancelled:
+                        zf.write(blob_path, name, compress_type=zip_compress_type(name))
+                finally:
+                    media_cache.release(sha256)
+                state, error = 'done', None
+            except Exception as e:
+                state, error = 'error', str(e)
+            if cancelled:
+                continue
+            with lock:
+                files[idx]['state'] = state
+                files[idx]['error'] = error
+                prog['current'] += 1
+                # Always set status to 'Downloading Files' (frontend shows current/total)
+                prog['status'] = "Downloading Files"
+                if not flush(force=True):
+                    # The job was deleted: drop queued downloads and stop writing the ZIP
+                    cancelled = True
+                    for pending in futures:
+                        pending.cancel()
+        with lock:
+            prog['status'] = "Preparing ZIP..."
+            flush(force=True)
+    if cancelled:
+        import shutil
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        return
+    ZIP_BUILD_SECONDS.labels("job").observe(time.time() - started)
+    with lock:
+        prog['zip_path'] = zip_path
+        prog['zip_size'] = os.path.getsize(zip_path)
+        prog['status'] = "ready"
+        prog['ready'] = True
+        flush(force=True)
 
 @app.post("/start-download-media")
 def start_download_media(data: dict):
     """
-    Starts the download and zipping process in a background thread, returns a job_id.
+    Queues the download and zipping job for a worker thread, returns a job_id.
     """
     job_id = str(uuid.uuid4())
     urls = data.get('urls', [])
     zip_name = data.get('zip_name', 'media-assets.zip')
-    progress_store[job_id] = {
+    # Requests may lower the server's byte budgets, not raise them
+    max_file_bytes = min(data.get('max_file_bytes') or DOWNLOAD_MAX_FILE_BYTES, DOWNLOAD_MAX_FILE_BYTES)
+    max_job_bytes = min(data.get('max_job_bytes') or DOWNLOAD_MAX_JOB_BYTES, DOWNLOAD_MAX_JOB_BYTES)
+    job_store.create(job_id, {
         'status': 'starting',
         'current': 0,
         'total': len(urls),
@@ -424,96 +2172,80 @@ def start_download_media(data: dict):
         'ready': False,
         'temp_dir': None,
         'zip_path': None,
-        'last_update': datetime.datetime.utcnow().timestamp()
-    }
-    def worker():
-        temp_dir = tempfile.mkdtemp()
-        file_paths = []
-        with progress_store_lock:
-            progress_store[job_id]['temp_dir'] = temp_dir
-            progress_store[job_id]['last_update'] = time.time()
-        # Download each file
-        for idx, url in enumerate(urls):
-            try:
-                r = requests.get(url, timeout=10)
-                r.raise_for_status()
-                filename = url.split("/")[-1] or "file"
-                file_path = os.path.join(temp_dir, filename)
-                with open(file_path, 'wb') as f:
-                    f.write(r.content)
-                file_paths.append(file_path)
-            except Exception as e:
-                continue
-            with progress_store_lock:
-                progress_store[job_id]['current'] = idx + 1
-                # Always set status to 'Downloading Files' (frontend shows current/total)
-                progress_store[job_id]['status'] = "Downloading Files"
-                progress_store[job_id]['last_update'] = time.time()
-        # Prepare ZIP
-        zip_path = os.path.join(temp_dir, zip_name)
-        with progress_store_lock:
-            progress_store[job_id]['status'] = "Preparing ZIP..."
-            progress_store[job_id]['last_update'] = time.time()
-        with zipfile.ZipFile(zip_path, "w", allowZip64=True) as zf:
-            for file_path in file_paths:
-                zf.write(file_path, os.path.basename(file_path))
-        with progress_store_lock:
-            progress_store[job_id]['zip_path'] = zip_path
-            progress_store[job_id]['zip_size'] = os.path.getsize(zip_path)
-            progress_store[job_id]['status'] = "ready"
-            progress_store[job_id]['ready'] = True
-            progress_store[job_id]['last_update'] = time.time()
-    threading.Thread(target=worker, daemon=True).start()
+        'bytes_downloaded': 0,
+        'bytes_total': 0,       # estimated size of the admitted files, known once they are checked
+        'throughput': 0,        # bytes per second since the job started
+        'max_file_bytes': max_file_bytes,
+        'max_job_bytes': max_job_bytes,
+        'files': job_files(urls),
+        'last_update': time.time(),
+        'version': 0
+    })
+    job_events.set_local(job_id, True)
+    try:
+        job_queue.put_nowait((job_id, run_download_job, (zip_name,)))
+    except queue.Full:
+        job_events.set_local(job_id, False)
+        job_store.delete(job_id)
+        raise HTTPException(status_code=503, detail="Too many download jobs queued, try again later.")
     return {"job_id": job_id}
 
 @app.get("/download-progress/{job_id}")
-def download_progress(job_id: str):
+async def download_progress(job_id: str, request: Request):
     """
-    SSE endpoint for progress updates.
+    SSE endpoint for progress updates. Each event's id is the record version, so a
+    reconnecting EventSource (Last-Event-ID) only receives states it has not seen.
     """
-    def event_stream():
-        last_status = None
-        while True:
-            with progress_store_lock:
-                prog = progress_store.get(job_id)
-                if prog:
-                    prog['last_update'] = time.time()
-            if not prog:
-                yield f"event: error\ndata: {json.dumps({'error': 'Job not found'})}\n\n"
-                break
-            if prog['status'] != last_status or prog['ready']:
-                yield f"data: {json.dumps(prog)}\n\n"
-                last_status = prog['status']
-            if prog['ready'] or prog['error']:
-                break
-            time.sleep(0.5)
-    return StreamingResponse(event_stream(), media_type="text/event-stream")
+    last_event_id = request.headers.get("last-event-id", "")
+    async def event_stream():
+        last_version = int(last_event_id) if last_event_id.isdigit() else -1
+        last_sent = time.monotonic()
+        with job_events.subscribe(job_id) as changed:
+            while True:
+                changed.clear()
+                prog = await asyncio.to_thread(job_store.get, job_id)
+                if not prog:
+                    yield f"event: error\ndata: {json.dumps({'error': 'Job not found'})}\n\n"
+                    break
+                version = prog.get('version', 0)
+                done = prog['ready'] or prog['error']
+                if version > last_version or done:
+                    yield f"id: {version}\ndata: {json.dumps(prog)}\n\n"
+                    last_version = version
+                    last_sent = time.monotonic()
+                if done:
+                    break
+                timeout = PROGRESS_HEARTBEAT_SECONDS if job_events.is_local(job_id) else PROGRESS_RESYNC_SECONDS
+                try:
+                    await asyncio.wait_for(changed.wait(), timeout)
+                except asyncio.TimeoutError:
+                    if time.monotonic() - last_sent >= PROGRESS_HEARTBEAT_SECONDS:
+                        yield ": heartbeat\n\n"
+                        last_sent = time.monotonic()
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"X-Accel-Buffering": "no"})
 
 @app.get("/download-ready/{job_id}")
 def download_ready(job_id: str):
-    prog = progress_store.get(job_id)
+    prog = job_store.get(job_id)
     if not prog or not prog.get('ready'):
         return {"ready": False}
     return {"ready": True, "zip_name": prog['zip_name']}
 
-@app.get("/download-zip/{job_id}")
-def download_zip(job_id: str):
-    prog = progress_store.get(job_id)
-    if not prog or not prog.get('ready'):
+@app.api_route("/download-zip/{job_id}", methods=["GET", "HEAD"])
+async def download_zip(job_id: str):
+    prog = await asyncio.to_thread(job_store.get, job_id)
+    if not prog or not prog.get('ready') or not os.path.exists(prog['zip_path']):
         raise HTTPException(status_code=404, detail="ZIP not ready")
-    zip_path = prog['zip_path']
-    zip_name = prog['zip_name']
-    def iterfile():
-        with open(zip_path, "rb") as f:
-            while True:
-                chunk = f.read(8192)
-                if not chunk:
-                    break
-                yield chunk
-        import shutil
-        shutil.rmtree(prog['temp_dir'], ignore_errors=True)
-        progress_store.pop(job_id, None)
-    from urllib.parse import quote
-    quoted_zip_name = quote(zip_name)
-    content_disposition = f"attachment; filename*=UTF-8''{quoted_zip_name}"
-    return StreamingResponse(iterfile(), media_type="application/zip", headers={"Content-Disposition": content_disposition})
+    # The ZIP is kept for resumed and repeated downloads; each request restarts its retention period
+    await asyncio.to_thread(job_store.update, job_id, {'last_download': time.time()})
+    return ZipFileResponse(prog['zip_path'], prog['zip_name'], "download_zip")
+
+@app.delete("/download-zip/{job_id}")
+def delete_download_zip(job_id: str):
+    """
+    Cancels a running job or releases a finished ZIP before its retention period ends.
+    """
+    prog = job_store.get(job_id)
+    if prog:
+        discard_job(job_id, prog)
+    return {"status": "deleted"}
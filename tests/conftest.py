@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# Keep the app's job store, scrape state and media cache away from a real installation
+STATE_DIR = tempfile.mkdtemp(prefix="audiobreak-tests-")
+os.environ.setdefault("JOB_STORE_URL", "sqlite:///" + os.path.join(STATE_DIR, "jobs.sqlite3"))
+os.environ.setdefault("SCRAPE_STATE_PATH", os.path.join(STATE_DIR, "scrape-state.sqlite3"))
+os.environ.setdefault("MEDIA_CACHE_DIR", os.path.join(STATE_DIR, "media-cache"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,113 @@
+"""
+Crawl bookkeeping: link canonicalization and the frontier's budgets and scope.
+"""
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import main
+
+@pytest.mark.parametrize("url, canonical", [
+    ("https://example.com/a#top", "https://example.com/a"),
+    ("https://example.com/a/", "https://example.com/a"),
+    ("https://example.com", "https://example.com/"),
+    ("HTTPS://Example.COM/Path", "https://example.com/Path"),
+    ("http://example.com:80/a", "http://example.com/a"),
+    ("https://example.com:443/a", "https://example.com/a"),
+    ("http://example.com:8080/a", "http://example.com:8080/a"),
+    ("https://example.com/a?", "https://example.com/a"),
+    ("https://example.com/a?page=2", "https://example.com/a?page=2"),
+])
+def test_canonical_url(url, canonical):
+    assert main.canonical_url(url) == canonical
+
+@pytest.mark.parametrize("url", ["http://host:99999/x", "http://[::1/x"])
+def test_canonical_url_invalid(url):
+    with pytest.raises(ValueError):
+        main.canonical_url(url)
+
+def test_crawl_host_ignores_www():
+    assert main.crawl_host("https://www.Example.com/a") == main.crawl_host("http://example.com:80/b") == "example.com"
+    assert main.crawl_host("https://cdn.example.com/") == "cdn.example.com"
+
+def test_frontier_queues_each_page_once():
+    frontier = main.CrawlFrontier(10)
+    assert frontier.add("https://example.com/a#top", 0) == "https://example.com/a"
+    assert frontier.add("https://example.com/a/", 1) is None
+    assert frontier.add("https://EXAMPLE.com:443/a#other", 1) is None
+    assert frontier.add("https://example.com/b", 1) == "https://example.com/b"
+    assert [frontier.pop(), frontier.pop()] == [("https://example.com/a", 0), ("https://example.com/b", 1)]
+    assert not frontier
+
+def test_frontier_budgets():
+    frontier = main.CrawlFrontier(2, max_depth=1)
+    assert frontier.add("https://example.com/1", 0)
+    assert frontier.add("https://example.com/deep", 2) is None
+    assert frontier.add("https://example.com/2", 1)
+    assert frontier.add("https://example.com/3", 1) is None
+    assert frontier.skipped["max_depth"] == {"https://example.com/deep"}
+    assert frontier.skipped["max_pages"] == {"https://example.com/3"}
+
+def test_frontier_same_host():
+    frontier = main.CrawlFrontier(10, hosts={main.crawl_host("https://example.com/")})
+    assert frontier.add("https://www.example.com/a", 1)
+    assert frontier.add("https://other.example.org/a", 1) is None
+    assert frontier.skipped["other_host"] == {"https://other.example.org/a"}
+
+def test_frontier_invalid_links():
+    frontier = main.CrawlFrontier(10, hosts={"example.com"})
+    assert frontier.add("http://example.com:99999/x", 1) is None
+    assert frontier.add("http://[::1/x", 1) is None
+    assert frontier.add("https://example.com/ok", 1) == "https://example.com/ok"
+    assert frontier.skipped["invalid"] == {"http://example.com:99999/x", "http://[::1/x"}
+
+def test_crawl_reports_invalid_start_url():
+    async def run():
+        request = main.ScrapeRequest(url="http://[::1/x")
+        return [record async for record in main.crawl(request, "html.parser")]
+    records = asyncio.run(run())
+    assert records[-1]["type"] == "summary"
+    assert records[-1]["scraped_pages"] == []
+    assert records[-1]["errors"] == ["Skipped 1 invalid links: http://[::1/x"]
+
+class CountingHandler(BaseHTTPRequestHandler):
+    requests = 0
+
+    def do_GET(self):
+        type(self).requests += 1
+        body = f"<html><body><p>{self.path}</p></body></html>".encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def test_crawl_prefetch_is_bounded(monkeypatch):
+    monkeypatch.setattr(main, "SCRAPE_MAX_WORKERS", 4)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CountingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    links = [f"{base}/prefetch/{n}" for n in range(40)]
+
+    async def run():
+        crawl = main.crawl(main.ScrapeRequest(url=links[0], pagination_links=links), "html.parser")
+        first = await crawl.__anext__()
+        # A slow consumer: give the prefetched pages time to finish
+        await asyncio.sleep(0.5)
+        fetched = CountingHandler.requests
+        records = [first] + [record async for record in crawl]
+        return fetched, records
+
+    try:
+        fetched, records = asyncio.run(run())
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert fetched <= 1 + main.SCRAPE_MAX_WORKERS
+    assert [r["scraped_pages"][0] for r in records[:-1]] == links
+    assert [r["results"] for r in records[:-1]] == [[f"/prefetch/{n}"] for n in range(40)]
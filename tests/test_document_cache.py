@@ -0,0 +1,45 @@
+"""
+The document cache's memory cap must account for parsed trees, not just page source.
+"""
+import os
+import tracemalloc
+
+import pytest
+
+import main
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+def pages():
+    for name in sorted(os.listdir(FIXTURES)):
+        with open(os.path.join(FIXTURES, name), "rb") as f:
+            yield name, f.read()
+    items = "".join(f'<div class="c{i}"><span><a href="/x/{i}">{i}</a></span><i>t</i></div>' for i in range(2000))
+    yield "dense", f"<html><body>{items}</body></html>".encode()
+    yield "text", f"<html><body><p>{'lorem ipsum dolor ' * 20000}</p></body></html>".encode()
+
+@pytest.mark.parametrize("name, content", list(pages()))
+@pytest.mark.parametrize("parser", main.available_html_parsers())
+def test_document_size_tracks_tree_memory(name, content, parser):
+    tracemalloc.start()
+    try:
+        soup = main.parse_html(content, parser)
+        tree, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    actual = len(content) + tree
+    assert actual / 2 <= main.document_size(content, soup) <= actual * 2
+
+def test_cap_counts_estimated_size():
+    content = b"<html><body>" + b"<p>x</p>" * 100 + b"</body></html>"
+    soup = main.parse_html(content)
+    size = main.document_size(content, soup)
+    assert size > 50 * len(content)
+    cache = main.DocumentCache(ttl=300, max_entries=100, max_bytes=int(size * 2.5))
+    for n in range(3):
+        entry = {'url': f"https://example.com/{n}", 'content': content, 'soup': soup, 'etag': None,
+                 'last_modified': None, 'fetched': 0, 'size': size}
+        cache._store(entry, "html.parser")
+    assert [key[0] for key in cache.entries] == ["https://example.com/1", "https://example.com/2"]
+    assert cache.stats()['bytes'] == 2 * size
+    assert cache.stats()['evictions'] == 1
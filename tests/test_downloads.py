@@ -0,0 +1,55 @@
+"""
+Download job bookkeeping: ZIP entry names and the files a job is made of.
+"""
+import pytest
+
+import main
+
+@pytest.mark.parametrize("url, name", [
+    ("https://example.com/audio/ep%201.mp3?x=1", "ep 1.mp3"),
+    ("https://example.com/..%2F..%2F.bashrc", "_.._.bashrc"),
+    ("https://example.com/a/..%2f..%2fetc%2fpasswd", "_.._etc_passwd"),
+    ("https://example.com/..%5C..%5Cboot.ini", "_.._boot.ini"),
+    ("https://example.com/%00evil.mp3", "evil.mp3"),
+    ("https://example.com/.hidden.mp3", "hidden.mp3"),
+    ("https://example.com/", "file"),
+    ("https://example.com/...", "file"),
+    ("https://example.com/..", "file"),
+    ("https://example.com/%2E%2E", "file"),
+])
+def test_media_filename(url, name):
+    assert main.media_filename(url) == name
+
+@pytest.mark.parametrize("url", [
+    "https://example.com/..%2F..%2F.bashrc",
+    "https://example.com/..%5C..%5C.bashrc",
+    "https://example.com/%2E%2E%2F%2E%2E%2Fx",
+])
+def test_media_filename_stays_in_archive(url):
+    name = main.media_filename(url)
+    assert "/" not in name and "\\" not in name
+    assert not name.startswith(".")
+
+def test_unique_name():
+    taken = set()
+    assert main.unique_name("ep.mp3", taken) == "ep.mp3"
+    assert main.unique_name("EP.mp3", taken) == "EP-2.mp3"
+    assert main.unique_name("ep.MP3", taken) == "ep-3.MP3"
+    assert main.unique_name("ep-2.mp3", taken) == "ep-2-2.mp3"
+    assert main.unique_name("notes", taken) == "notes"
+    assert main.unique_name("Notes", taken) == "Notes-2"
+    assert taken == {"ep.mp3", "ep-2.mp3", "ep-3.mp3", "ep-2-2.mp3", "notes", "notes-2"}
+
+def test_job_files():
+    files = main.job_files([
+        "https://example.com/a/ep.mp3",
+        "https://example.com/b/EP.mp3",
+        "https://EXAMPLE.com/a/ep.mp3#t=10",
+        "http://example.com:99999/c.mp3",
+        "http://[::1/d.mp3",
+    ])
+    assert [(f['name'], f['state']) for f in files[:3]] == [("ep.mp3", "queued"), ("EP-2.mp3", "queued"), ("ep.mp3", "skipped")]
+    assert files[2]['error'] == "Duplicate URL"
+    for file in files[3:]:
+        assert file['state'] == 'error'
+        assert file['error'].startswith("Invalid URL")
@@ -0,0 +1,45 @@
+"""
+Every JobStore implementation must behave the same through a job's lifecycle.
+"""
+import os
+
+import pytest
+
+import main
+
+@pytest.fixture(params=["sqlite", "redis"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return main.SQLiteJobStore(os.path.join(tmp_path, "jobs.sqlite3"))
+    fakeredis = pytest.importorskip("fakeredis")
+    return main.RedisJobStore(client=fakeredis.FakeRedis())
+
+def test_job_lifecycle(store):
+    assert store.get("a") is None
+    assert store.count() == 0
+    store.create("a", {"status": "starting", "current": 0})
+    store.create("b", {"status": "starting", "current": 0})
+    assert store.get("a") == {"status": "starting", "current": 0}
+    assert store.count() == 2
+
+    first = store.update("a", {"current": 1})
+    second = store.update("a", {"status": "ready"})
+    assert first == {"status": "starting", "current": 1, "version": 1}
+    assert second == {"status": "ready", "current": 1, "version": 2}
+    assert store.get("a") == second
+    assert dict(store.items()) == {"a": second, "b": {"status": "starting", "current": 0}}
+
+    store.delete("a")
+    assert store.get("a") is None
+    assert store.update("a", {"current": 2}) is None
+    assert store.count() == 1
+    assert [job_id for job_id, _ in store.items()] == ["b"]
+
+def test_job_store_is_abstract():
+    with pytest.raises(TypeError):
+        main.JobStore()
+    class PartialStore(main.JobStore):
+        def create(self, job_id, record):
+            pass
+    with pytest.raises(TypeError):
+        PartialStore()
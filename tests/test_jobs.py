@@ -0,0 +1,70 @@
+"""
+Background job bookkeeping: failing jobs orphaned by a restart and removing old ones.
+"""
+import time
+import uuid
+
+import pytest
+
+import main
+
+@pytest.fixture
+def local_timezone(monkeypatch):
+    """
+    Runs the test away from UTC, where a naive UTC clock would be hours off.
+    """
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+def new_job(**fields):
+    job_id = f"test-{uuid.uuid4()}"
+    main.job_store.create(job_id, dict({'status': 'Downloading Files', 'ready': False, 'error': None, 'temp_dir': None}, **fields))
+    return job_id
+
+def test_fresh_job_of_another_process_is_kept(local_timezone):
+    job_id = new_job(last_update=time.time())
+    assert not main.job_events.is_local(job_id)
+    main.fail_abandoned_jobs()
+    record = main.job_store.get(job_id)
+    assert record['error'] is None
+    assert record['status'] == 'Downloading Files'
+    main.job_store.delete(job_id)
+
+def test_stale_job_is_failed(local_timezone):
+    job_id = new_job(last_update=time.time() - main.ABANDONED_JOB_SECONDS - 60)
+    main.fail_abandoned_jobs()
+    record = main.job_store.get(job_id)
+    assert record['status'] == 'error'
+    assert record['error'].startswith("Interrupted")
+    main.job_store.delete(job_id)
+
+def test_local_job_is_refreshed(local_timezone):
+    stale = time.time() - main.ABANDONED_JOB_SECONDS - 60
+    job_id = new_job(last_update=stale)
+    main.job_events.set_local(job_id, True)
+    try:
+        main.fail_abandoned_jobs()
+    finally:
+        main.job_events.set_local(job_id, False)
+    record = main.job_store.get(job_id)
+    assert record['error'] is None
+    assert record['last_update'] > stale
+    main.job_store.delete(job_id)
+
+def test_finished_zip_kept_for_retention_window(local_timezone, tmp_path):
+    now = time.time()
+    kept = new_job(status='ready', ready=True, temp_dir=str(tmp_path), last_update=now - main.STALE_JOB_SECONDS + 60)
+    downloaded = new_job(status='ready', ready=True, last_update=now - 2 * main.STALE_JOB_SECONDS, last_download=now - 60)
+    expired = new_job(status='ready', ready=True, last_update=now - main.STALE_JOB_SECONDS - 60)
+    running = new_job(last_update=now - 2 * main.STALE_JOB_SECONDS)
+    main.remove_stale_jobs()
+    assert main.job_store.get(kept) is not None
+    assert tmp_path.exists()
+    assert main.job_store.get(downloaded) is not None
+    assert main.job_store.get(expired) is None
+    assert main.job_store.get(running) is not None
+    for job_id in (kept, downloaded, running):
+        main.job_store.delete(job_id)